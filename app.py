@@ -1,12 +1,291 @@
 import streamlit as st
-import pandas as pd
-import tempfile
-import os
-from document_reader import read_document
-from extractor import extract_obligations
-from excel_mapper import map_to_framework
-from comprehensive_summarizer import ComprehensiveObservationSummarizer  # ADD THIS
-from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+import hashlib
+import time
+from io import BytesIO
+from excel_mapper import update_framework_column, read_framework_sheet
+from cache import TieredCache
+from framework_index import default_index_cache
+from workspace import SessionWorkspace, purge_stale_workspaces
+from jobs import JobManager
+from instrumentation import collect_metrics, summarize_stages
+from assessment import run_assessment
+from document_reader import BACKENDS, backends_for
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, PDF_BACKEND
+
+# Refresh interval of the page while a job is running
+POLL_SECONDS = 1
+
+# Cached pipeline stages: a rerun (e.g. toggling a checkbox) only recomputes
+# what its inputs changed, and adding a document only processes that document
+
+@st.cache_resource
+def get_summarizer():
+    """One summarizer (and spaCy model) for the whole server"""
+    # Imported here so the page comes up before spaCy is loaded
+    from comprehensive_summarizer import ComprehensiveObservationSummarizer, default_summary_cache
+    return ComprehensiveObservationSummarizer(cache=default_summary_cache())
+
+@st.cache_resource
+def get_extraction_results():
+    """Per-document extraction results keyed by content hash, shared across reruns and sessions"""
+    return TieredCache(max_entries=256)
+
+@st.cache_resource
+def get_framework_indexes():
+    """Parsed framework workbooks keyed by content hash, shared across sessions and restarts"""
+    return default_index_cache()
+
+@st.cache_resource
+def get_job_manager():
+    """Background assessment jobs, shared by all sessions so a job outlives the page that started it"""
+    return JobManager()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_framework_frame(mapped_key, _mapped_bytes):
+    return read_framework_sheet(BytesIO(_mapped_bytes))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def concise_observations(mapped_key, _observations, _keywords):
+    """Concise observations and the stage timings of generating them"""
+    with collect_metrics() as stages:
+        values = get_summarizer().generate_concise_observations(_observations, _keywords)
+    return values, stages
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def framework_download(mapped_key, with_concise, _mapped_bytes, _concise_values):
+    """Workbook bytes to download, with the Concise_Observation column filled in when enabled"""
+    if not with_concise:
+        return _mapped_bytes
+    output = BytesIO()
+    update_framework_column(BytesIO(_mapped_bytes), 'Concise_Observation', _concise_values, output)
+    return output.getvalue()
+
+@st.cache_resource(ttl=3600)
+def purge_workspaces():
+    """Remove abandoned session workspaces (at most once an hour)"""
+    return purge_stale_workspaces()
+
+def get_workspace():
+    """This session's private scratch directory"""
+    if 'workspace' not in st.session_state:
+        st.session_state.workspace = SessionWorkspace()
+    return st.session_state.workspace
+
+def upload_digests(uploaded_files):
+    """
+    SHA-256 of each uploaded file by file_id. A file is hashed once per upload,
+    not on every rerun; digests of files no longer uploaded are dropped.
+    """
+    known = st.session_state.get('upload_digests', {})
+    digests = {}
+    for uploaded_file in uploaded_files:
+        digest = known.get(uploaded_file.file_id)
+        if digest is None:
+            digest = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+        digests[uploaded_file.file_id] = digest
+    st.session_state.upload_digests = digests
+    return digests
+
+def current_job(framework_file, uploaded_files, parallel_pdf, pdf_backend, match_controls, parallel_match):
+    """
+    The job for the uploaded files, submitting a new one when the inputs changed.
+    Without uploads, the job in the URL (?job=...) is reattached, so a user
+    can leave the page and come back to a running assessment.
+    """
+    manager = get_job_manager()
+    
+    if framework_file is None or not uploaded_files:
+        job_id = st.query_params.get('job')
+        return manager.get(job_id) if job_id else None
+    
+    digests = upload_digests([framework_file, *uploaded_files])
+    # The documents are assessed as a set, so their upload order doesn't matter
+    inputs = [digests[framework_file.file_id]]
+    inputs += sorted(digests[uploaded_file.file_id] for uploaded_file in uploaded_files)
+    inputs.append(f"{parallel_pdf}:{pdf_backend}:{match_controls}:{parallel_match}")
+    inputs = hashlib.sha256('\n'.join(inputs).encode()).hexdigest()
+    
+    job = manager.get(st.session_state.get('job_id', ''))
+    # Same inputs: keep the job, even a cancelled one (it restarts once the inputs change)
+    if job is not None and st.session_state.get('job_inputs') == inputs:
+        return job
+    
+    # The inputs changed: stop this session's previous job and start over
+    if job is not None and not job.finished:
+        job.cancel()
+    purge_workspaces()
+    framework_bytes = framework_file.getvalue()
+    documents = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+    title = f"{len(documents)} document(s) against {framework_file.name}"
+    job = manager.submit(title, run_assessment, documents, framework_bytes, KEYWORD_CATEGORIES,
+                         CATEGORY_TO_DOMAIN, parallel=parallel_pdf, workspace=get_workspace(),
+                         results=get_extraction_results(), backend={'.pdf': pdf_backend},
+                         match_controls=match_controls, framework_indexes=get_framework_indexes(),
+                         parallel_match=parallel_match)
+    st.session_state.job_id = job.id
+    st.session_state.job_inputs = inputs
+    st.query_params['job'] = job.id
+    return job
+
+def show_clause_preview(file_name, obligations):
+    """Show the first 5 extracted clauses of a document"""
+    if obligations:
+        with st.expander(f"View extracted clauses from {file_name}"):
+            for i, obligation in enumerate(obligations[:5], 1):
+                st.write(f"{i}. **{obligation['domain']}**: {obligation['text']}")
+            if len(obligations) > 5:
+                st.write(f"... and {len(obligations) - 5} more clauses")
+
+def show_job_progress(job, snapshot):
+    """Live progress of a running job, with the clauses found so far"""
+    progress = snapshot['progress']
+    st.info(f"⏳ {snapshot['stage']}... ({snapshot['seconds']:.0f}s)")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Pages / Blocks Read", progress.get('chunks', 0))
+    with col2:
+        st.metric("Sentences Scanned", progress.get('sentences', 0))
+    with col3:
+        st.metric("Clauses Found", progress.get('clauses', 0))
+    with col4:
+        st.metric("Documents Done", progress.get('documents', 0))
+    
+    for warning in snapshot['warnings']:
+        st.warning(warning)
+    
+    # Show the latest clauses as they arrive
+    recent = snapshot['items']
+    if recent:
+        st.write("**Latest clauses:**")
+        for obligation in recent:
+            st.write(f"• **{obligation['domain']}**: {obligation['text']}")
+    
+    show_stage_timings(snapshot['stages'])
+    
+    if st.button("⏹️ Cancel Assessment"):
+        job.cancel()
+        st.rerun()
+
+def show_stage_timings(stages):
+    """Table of where the time went, one row per stage"""
+    rows = []
+    for stage in summarize_stages(stages):
+        labels = [stage[name] for name in stage if name != 'stage' and isinstance(stage[name], str)]
+        counters = [name for name in stage if name not in ('stage', 'seconds') and not name.endswith('_per_s')
+                    and not isinstance(stage[name], str)]
+        rows.append({
+            'Stage': stage['stage'] + (f" ({', '.join(labels)})" if labels else ""),
+            'Seconds': round(stage['seconds'], 3),
+            'Items': ", ".join(f"{stage[name]:,} {name}" for name in counters),
+            'Throughput': ", ".join(f"{stage[f'{name}_per_s']:,.0f} {name}/s"
+                                    for name in counters if f"{name}_per_s" in stage)
+        })
+    if rows:
+        import pandas as pd
+        with st.expander("⏱️ Stage Timings"):
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+
+def show_results(result, stages, enable_concise):
+    """Per-document clauses, the mapped framework and the download"""
+    st.subheader("📊 Processing Results")
+    for document in result['documents']:
+        st.write(f"**Processed:** {document['name']}")
+        st.write(f"📖 Found {len(document['obligations'])} relevant clauses")
+        show_clause_preview(document['name'], document['obligations'])
+    
+    cache_stats = result['cache_stats']
+    if cache_stats is not None:
+        st.sidebar.caption(f"🗄️ Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                           f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1_000_000:.1f} MB)")
+    
+    # Map all obligations to framework
+    if not result['obligations']:
+        st.warning("⚠️ No relevant obligations found in the uploaded documents.")
+        show_stage_timings(stages)
+        return
+    
+    st.subheader("🎯 Mapping to Framework")
+    mapped_bytes = result['mapped_bytes']
+    mapped_key = result['mapped_key']
+    df = load_framework_frame(mapped_key, mapped_bytes)
+    
+    # ADD THIS: Apply concise observations if enabled
+    concise_values = None
+    if enable_concise:
+        with st.spinner("🔄 Generating concise observations..."):
+            try:
+                # Add concise observations column
+                concise_values, concise_stages = concise_observations(mapped_key, df['Observation'], df['Keywords'])
+                stages = stages + concise_stages
+                df['Concise_Observation'] = concise_values
+                st.success("✅ Concise observations generated!")
+                summary_stats = get_summarizer().cache.stats()
+                st.caption(f"🗄️ Summary cache hit rate: {summary_stats['hit_rate']:.0%} "
+                           f"({summary_stats['memory_hits'] + summary_stats['disk_hits']} hits, "
+                           f"{summary_stats['misses']} misses)")
+    
+            except Exception as e:
+                st.error(f"❌ Error generating concise observations: {str(e)}")
+    
+    st.success("✅ Successfully mapped all obligations to framework!")
+    
+    # Show preview of updated framework
+    st.subheader("📋 Framework Preview")
+    # Determine which observation column to show
+    if enable_concise and 'Concise_Observation' in df.columns:
+        observation_col = 'Concise_Observation'
+        st.info("📝 Showing concise observations (toggle in sidebar to see original)")
+    else:
+        observation_col = 'Observation'
+        st.info("📝 Showing original observations")
+    
+    # Show only rows with observations
+    df_with_observations = df[df[observation_col].notna() & (df[observation_col] != '')]
+    
+    if not df_with_observations.empty:
+        st.write(f"**Rows with findings ({len(df_with_observations)}):**")
+        display_columns = ['Control Ref', 'Domain', 'Keywords', observation_col]
+        st.dataframe(
+            df_with_observations[display_columns],
+            height=400
+        )
+    
+        # ADD THIS: Show comparison if both columns exist
+        if enable_concise and 'Concise_Observation' in df.columns and 'Observation' in df.columns:
+            with st.expander("🔍 Compare Original vs Concise Observations"):
+                compare_df = df[
+                    df['Concise_Observation'].notna() & 
+                    (df['Concise_Observation'] != '')
+                ][['Keywords', 'Observation', 'Concise_Observation']].head(5)
+    
+                for _, row in compare_df.iterrows():
+                    st.write(f"**Keyword:** {row['Keywords']}")
+                    st.write(f"**Original:** {row['Observation'][:200]}...")
+                    st.write(f"**Concise:** {row['Concise_Observation']}")
+                    st.markdown("---")
+    else:
+        st.info("No observations found in the uploaded documents.")
+    
+    # Download button for the updated framework
+    st.download_button(
+        label="📥 Download Updated Framework",
+        data=framework_download(mapped_key, concise_values is not None, mapped_bytes, concise_values),
+        file_name="Updated_Privacy_Framework.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    
+    # Statistics
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Documents Processed", len(result['documents']))
+    with col2:
+        st.metric("Clauses Extracted", len(result['obligations']))
+    with col3:
+        rows_updated = len(df_with_observations)
+        st.metric("Framework Rows Updated", rows_updated)
+    
+    show_stage_timings(stages)
 
 # Configure the page
 st.set_page_config(
@@ -46,166 +325,36 @@ enable_concise = st.sidebar.checkbox(
     help="Generate clean, non-repetitive observations"
 )
 
-# Main content area
-if framework_file is not None:
-    # Save uploaded framework to temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp_framework:
-        tmp_framework.write(framework_file.getvalue())
-        framework_path = tmp_framework.name
-    
-    st.success(f"✅ Framework uploaded: {framework_file.name}")
-    
-    if uploaded_files:
-        st.subheader("📊 Processing Results")
-        
-        # Create a working copy of the framework
-        working_framework = "working_framework.xlsx"
-        
-        # Process each uploaded file
-        all_obligations = []
-        
-        for uploaded_file in uploaded_files:
-            st.write(f"**Processing:** {uploaded_file.name}")
-            
-            # Save uploaded document to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                document_path = tmp_file.name
-            
-            try:
-                # Read and extract from document
-                text = read_document(document_path)
-                obligations = extract_obligations(text, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN)
-                
-                st.write(f"📖 Found {len(obligations)} relevant clauses")
-                
-                # Show sample of extracted obligations
-                if obligations:
-                    with st.expander(f"View extracted clauses from {uploaded_file.name}"):
-                        for i, obligation in enumerate(obligations[:5], 1):  # Show first 5
-                            st.write(f"{i}. **{obligation['domain']}**: {obligation['text']}")
-                        if len(obligations) > 5:
-                            st.write(f"... and {len(obligations) - 5} more clauses")
-                
-                all_obligations.extend(obligations)
-                
-                # Clean up temporary file
-                os.unlink(document_path)
-                
-            except Exception as e:
-                st.error(f"❌ Error processing {uploaded_file.name}: {str(e)}")
-        
-        # Map all obligations to framework
-        if all_obligations:
-            st.subheader("🎯 Mapping to Framework")
-            
-            # Use the first framework as base, then update incrementally
-            if os.path.exists(working_framework):
-                current_framework = working_framework
-            else:
-                current_framework = framework_path
-            
-            success = map_to_framework(all_obligations, current_framework, working_framework)
-            
-            if success:
-                # ADD THIS: Apply concise observations if enabled
-                if enable_concise:
-                    with st.spinner("🔄 Generating concise observations..."):
-                        try:
-                            summarizer = ComprehensiveObservationSummarizer()
-                            df = pd.read_excel(working_framework)
-                            
-                            # Add concise observations column
-                            df['Concise_Observation'] = df.apply(
-                                lambda row: summarizer.generate_concise_observation(
-                                    row['Observation'] if pd.notna(row['Observation']) else "",
-                                    row['Keywords'] if pd.notna(row['Keywords']) else ""
-                                ), 
-                                axis=1
-                            )
-                            
-                            # Save back to working framework
-                            df.to_excel(working_framework, index=False)
-                            st.success("✅ Concise observations generated!")
-                            
-                        except Exception as e:
-                            st.error(f"❌ Error generating concise observations: {str(e)}")
-                
-                st.success("✅ Successfully mapped all obligations to framework!")
-                
-                # Show preview of updated framework
-                st.subheader("📋 Framework Preview")
-                df = pd.read_excel(working_framework)
-                
-                # Determine which observation column to show
-                if enable_concise and 'Concise_Observation' in df.columns:
-                    observation_col = 'Concise_Observation'
-                    st.info("📝 Showing concise observations (toggle in sidebar to see original)")
-                else:
-                    observation_col = 'Observation'
-                    st.info("📝 Showing original observations")
-                
-                # Show only rows with observations
-                df_with_observations = df[df[observation_col].notna() & (df[observation_col] != '')]
-                
-                if not df_with_observations.empty:
-                    st.write(f"**Rows with findings ({len(df_with_observations)}):**")
-                    display_columns = ['Control Ref', 'Domain', 'Keywords', observation_col]
-                    st.dataframe(
-                        df_with_observations[display_columns],
-                        height=400
-                    )
-                    
-                    # ADD THIS: Show comparison if both columns exist
-                    if enable_concise and 'Concise_Observation' in df.columns and 'Observation' in df.columns:
-                        with st.expander("🔍 Compare Original vs Concise Observations"):
-                            compare_df = df[
-                                df['Concise_Observation'].notna() & 
-                                (df['Concise_Observation'] != '')
-                            ][['Keywords', 'Observation', 'Concise_Observation']].head(5)
-                            
-                            for _, row in compare_df.iterrows():
-                                st.write(f"**Keyword:** {row['Keywords']}")
-                                st.write(f"**Original:** {row['Observation'][:200]}...")
-                                st.write(f"**Concise:** {row['Concise_Observation']}")
-                                st.markdown("---")
-                else:
-                    st.info("No observations found in the uploaded documents.")
-                
-                # Download button for the updated framework
-                with open(working_framework, "rb") as file:
-                    st.download_button(
-                        label="📥 Download Updated Framework",
-                        data=file,
-                        file_name="Updated_Privacy_Framework.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-                
-                # Statistics
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Documents Processed", len(uploaded_files))
-                with col2:
-                    st.metric("Clauses Extracted", len(all_obligations))
-                with col3:
-                    rows_updated = len(df_with_observations)
-                    st.metric("Framework Rows Updated", rows_updated)
-                
-            else:
-                st.error("❌ Failed to map obligations to framework")
-        else:
-            st.warning("⚠️ No relevant obligations found in the uploaded documents.")
-    
-    else:
-        st.info("👆 Upload privacy documents to start analysis")
-        
-    # Clean up temporary framework file
-    os.unlink(framework_path)
-    
-else:
-    st.info("👆 Please upload your Excel framework template to get started")
+parallel_pdf = st.sidebar.checkbox(
+    "Parallel PDF Extraction",
+    value=False,
+    help="Extract PDF pages on all CPU cores (faster for large regulatory packs)"
+)
+
+parallel_match = st.sidebar.checkbox(
+    "Parallel Keyword Matching",
+    value=False,
+    help="Match the keywords of very large documents on all CPU cores (small documents are matched as usual)"
+)
+
+pdf_backends = backends_for('.pdf')
+pdf_backend = st.sidebar.selectbox(
+    "PDF Text Extraction",
+    pdf_backends,
+    index=pdf_backends.index(PDF_BACKEND),
+    format_func=lambda name: f"{name}: {BACKENDS[name].description}",
+    help="Layout-aware extraction is the most faithful; fast skips the layout analysis "
+         "(see Stage Timings for the throughput of each)"
+)
 
-# Instructions in sidebar
+match_controls = st.sidebar.checkbox(
+    "Map Clauses to Individual Controls",
+    value=False,
+    help="Write each clause only to the framework rows whose Keywords it resembles most, "
+         "instead of to every row of its domain"
+)
+
+# Instructions in sidebar, before the main area (which reruns while a job is polled)
 st.sidebar.markdown("---")
 st.sidebar.subheader("📋 How to Use")
 st.sidebar.markdown("""
@@ -220,4 +369,35 @@ st.sidebar.markdown("""
 **Supported Formats:**
 - Excel: .xlsx
 - Documents: .pdf, .docx, .txt
-""")
\ No newline at end of file
+""")
+
+# Main content area
+job = current_job(framework_file, uploaded_files, parallel_pdf, pdf_backend, match_controls, parallel_match)
+
+if job is not None:
+    if framework_file is not None:
+        st.success(f"✅ Framework uploaded: {framework_file.name}")
+    
+    snapshot = job.snapshot()
+    st.caption(f"Job `{snapshot['id']}`: {snapshot['title']}")
+    
+    if snapshot['status'] in ('queued', 'running'):
+        show_job_progress(job, snapshot)
+        # Poll until the job finishes
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+    elif snapshot['status'] == 'cancelled':
+        st.warning("⏹️ Assessment cancelled. Change the uploads or options to start a new one.")
+    elif snapshot['status'] == 'failed':
+        st.error(f"❌ Assessment failed: {snapshot['error']}")
+    else:
+        for warning in snapshot['warnings']:
+            st.warning(warning)
+        show_results(job.result, snapshot['stages'], enable_concise)
+
+elif framework_file is not None:
+    st.success(f"✅ Framework uploaded: {framework_file.name}")
+    st.info("👆 Upload privacy documents to start analysis")
+        
+else:
+    st.info("👆 Please upload your Excel framework template to get started")
@@ -0,0 +1,125 @@
+# assessment.py
+import hashlib
+import tempfile
+from io import BytesIO
+
+from pipeline import stream_obligations
+from excel_mapper import map_to_framework, read_framework_sheet
+from cache import DiskCache, rules_fingerprint
+from workspace import SessionWorkspace
+from config import CACHE_PATH
+
+def run_assessment(job, documents, framework_bytes, keyword_categories, category_to_domain, parallel=False,
+                   workspace=None, results=None, cache_path=CACHE_PATH, backend=None, match_controls=False,
+                   framework_indexes=None, parallel_match=False):
+    """
+    Background job: extract uploaded documents and map them onto the framework.
+
+    documents is a list of (file name, bytes). Progress is reported on the job
+    (documents, chunks, sentences, clauses, rows_mapped) and clauses are
+    published with job.add_items as they are found. Extraction results are
+    kept in results (e.g. a TieredCache) keyed by content hash, so a document
+    seen before is not read again. Documents are written to the workspace
+    while they are read (a temporary one without a workspace). backend picks the text-extraction backends
+    (see document_reader.resolve_backend). match_controls maps clauses to
+    individual framework rows (see excel_mapper.map_to_framework), and
+    framework_indexes caches parsed framework workbooks (see framework_index).
+    parallel_match matches the keywords of a large document in chunk-parallel
+    processes (the clauses are the same).
+    """
+    rules = rules_fingerprint(keyword_categories, category_to_domain)
+    summaries = []
+    document_obligations = {}
+    cache = DiskCache(cache_path) if cache_path else None
+    temporary = None
+    if workspace is None:
+        temporary = tempfile.TemporaryDirectory(prefix='assessment-')
+        workspace = SessionWorkspace(root=temporary.name)
+
+    try:
+        for name, data in documents:
+            job.set_stage(f"Reading {name}")
+            document_hash = hashlib.sha256(data).hexdigest()
+            result_key = f"{document_hash}:{rules}:{parallel}:{backend}"
+
+            cached = results.get(result_key) if results is not None else None
+            if cached is not None:
+                obligations, skipped_pages = cached
+                job.add_items(obligations)
+                job.advance('clauses', len(obligations))
+            else:
+                try:
+                    obligations, skipped_pages = _extract(job, name, data, document_hash, keyword_categories,
+                                                          category_to_domain, parallel, workspace, cache, backend,
+                                                          parallel_match)
+                except Exception as e:
+                    if job.cancel_requested:
+                        raise
+                    job.warn(f"❌ Error processing {name}: {str(e)}")
+                    job.advance('documents')
+                    continue
+
+                if skipped_pages:
+                    job.warn(f"⚠️ {name}: skipped {len(skipped_pages)} unreadable page(s): "
+                             + ", ".join(f"p.{page} ({reason})" for page, reason in skipped_pages))
+                elif results is not None:
+                    # Keep complete reads only, so skipped pages are retried on the next run
+                    results.put(result_key, (obligations, skipped_pages))
+
+            document_obligations[document_hash] = obligations
+            summaries.append({'name': name, 'sha256': document_hash, 'obligations': obligations})
+            job.advance('documents')
+    finally:
+        cache_stats = cache.stats() if cache is not None else None
+        if cache is not None:
+            cache.close()
+        if temporary is not None:
+            temporary.cleanup()
+
+    # The mapped framework depends only on the framework and the set of documents
+    document_hashes = tuple(sorted(document_obligations))
+    all_obligations = [obligation for document_hash in document_hashes
+                       for obligation in document_obligations[document_hash]]
+
+    mapped_bytes = None
+    if all_obligations:
+        job.set_stage("Mapping to framework")
+        output = BytesIO()
+        if not map_to_framework(all_obligations, BytesIO(framework_bytes), output,
+                                match_controls=match_controls, index_cache=framework_indexes):
+            raise RuntimeError("Failed to map obligations to framework")
+        mapped_bytes = output.getvalue()
+        observations = read_framework_sheet(BytesIO(mapped_bytes))['Observation']
+        job.advance('rows_mapped', int((observations.notna() & (observations.astype(str) != '')).sum()))
+
+    return {
+        'documents': summaries,
+        'document_hashes': document_hashes,
+        'obligations': all_obligations,
+        'mapped_bytes': mapped_bytes,
+        'mapped_key': hashlib.sha256(mapped_bytes).hexdigest() if mapped_bytes is not None else None,
+        'cache_stats': cache_stats
+    }
+
+def _extract(job, name, data, document_hash, keyword_categories, category_to_domain, parallel, workspace, cache,
+             backend, parallel_match=False):
+    """Stream one document's clauses onto the job; returns (obligations, skipped_pages)"""
+    document_name = f"{document_hash}.{name.split('.')[-1]}"
+    obligations = []
+    skipped_pages = []
+
+    with workspace.lock():
+        document_path = workspace.write(document_name, data)
+        try:
+            for obligation in stream_obligations(document_path, keyword_categories, category_to_domain,
+                                                 cache=cache, on_progress=job.advance, parallel=parallel,
+                                                 skipped_pages=skipped_pages, backend=backend,
+                                                 parallel_match=parallel_match):
+                obligations.append(obligation)
+                job.add_items([obligation])
+                job.advance('clauses')
+        finally:
+            # Clean up the uploaded copy
+            workspace.remove(document_name)
+
+    return obligations, skipped_pages
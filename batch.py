@@ -0,0 +1,240 @@
+# batch.py
+"""
+Non-interactive batch mode: read and extract a whole directory (or glob) of
+documents concurrently, then map everything onto the framework in one pass.
+
+Usage:
+    python batch.py contracts/
+    python batch.py "vendors/**/*.pdf" --workers 8 --summary overnight.json
+    python batch.py scans/ --pdf-backend fast
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from pipeline import stream_obligations
+from document_reader import backends_for
+from excel_mapper import map_to_framework
+from observation_store import ObservationStore, store_path_for
+from cache import DiskCache, file_sha256
+from instrumentation import configure_logging, collect_metrics, summarize_stages
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, ORIGINAL_FRAMEWORK_PATH, WORKING_FRAMEWORK_PATH, CACHE_PATH, \
+    LOG_LEVEL, PDF_BACKEND, FRAMEWORK_CACHE_PATH
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+def collect_documents(target):
+    """
+    Find supported documents in a directory (recursively) or matching a glob pattern
+    """
+    if os.path.isdir(target):
+        paths = []
+        for root, _, files in os.walk(target):
+            paths.extend(os.path.join(root, name) for name in files)
+    else:
+        paths = glob.glob(target, recursive=True)
+
+    return sorted(path for path in paths
+                  if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS))
+
+def process_document(file_path, word_boundaries=False, cache_path=None, backend=None, parallel_match=False):
+    """
+    Read and extract one document (runs in a worker process).
+    backend is passed to the reader, e.g. {'.pdf': 'fast'}; parallel_match
+    spreads the keyword matching of a large document over more processes.
+    """
+    start = time.perf_counter()
+    # Each worker opens its own connection to the shared cache file
+    cache = DiskCache(cache_path) if cache_path else None
+    doc_hash = None
+    with collect_metrics() as stages:
+        try:
+            doc_hash = file_sha256(file_path)
+            obligations = list(stream_obligations(file_path, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN,
+                                                  word_boundaries, cache=cache, backend=backend,
+                                                  parallel_match=parallel_match))
+            error = None
+        except Exception as e:
+            obligations = []
+            error = str(e)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    return {
+        'file': file_path,
+        'sha256': doc_hash,
+        'obligations': obligations,
+        'seconds': time.perf_counter() - start,
+        'error': error,
+        'stages': stages,
+        'cache_hits': cache.hits if cache is not None else 0,
+        'cache_misses': cache.misses if cache is not None else 0
+    }
+
+def run_batch(file_paths, framework_path, output_path, summary_path, workers=None, word_boundaries=False,
+              cache_path=CACHE_PATH, store_path=None, log_level=LOG_LEVEL, metrics_path=None,
+              pdf_backend=PDF_BACKEND, match_controls=False, framework_cache_path=FRAMEWORK_CACHE_PATH,
+              parallel_match=False):
+    """
+    Process documents in a worker pool, map all obligations once and write a JSON summary.
+    Returns the summary dict.
+
+    With a store_path, each document's clauses are appended to that
+    observation store and this run's documents are exported from it;
+    otherwise their clauses are mapped directly.
+
+    PDFs are read with the pdf_backend text-extraction backend; the summary's
+    read stages report the throughput of each backend used. match_controls
+    maps clauses to the framework rows whose Keywords they resemble most,
+    instead of to every row of their domain. Parsed framework workbooks are
+    kept in the framework_cache_path cache. parallel_match matches the
+    keywords of a large document in chunk-parallel processes, for runs over
+    a few very large files (see extractor.iter_obligations).
+    """
+    started_at = datetime.now().isoformat(timespec='seconds')
+    batch_start = time.perf_counter()
+    results = {}
+
+    print(f"Processing {len(file_paths)} documents with {workers or os.cpu_count()} workers...")
+    # Workers log (and append stage timings) like this process
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_logging,
+                             initargs=(log_level, metrics_path)) as pool:
+        futures = [pool.submit(process_document, path, word_boundaries, cache_path, {'.pdf': pdf_backend},
+                               parallel_match)
+                   for path in file_paths]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result['file']] = result
+            if result['error']:
+                print(f"❌ {result['file']}: {result['error']}")
+            else:
+                print(f"✅ {result['file']}: {len(result['obligations'])} clauses ({result['seconds']:.2f}s)")
+
+    # Merge in file order so the output doesn't depend on completion order
+    all_obligations = []
+    for path in file_paths:
+        all_obligations.extend(results[path]['obligations'])
+
+    store = ObservationStore(store_path) if store_path else None
+    if store is not None:
+        for path in file_paths:
+            result = results[path]
+            result['new_clauses'] = 0
+            if result['obligations']:
+                result['new_clauses'] = store.add_document(path, result['sha256'], result['obligations'])
+        print(f"🗄️ Observation store: {store.count_documents()} documents, {store.count_obligations()} clauses")
+
+    mapped = False
+    mapping_seconds = 0.0
+    mapping_stages = []
+    if all_obligations:
+        print(f"\nMapping {len(all_obligations)} clauses to framework: {framework_path}")
+        mapping_start = time.perf_counter()
+        index_cache = DiskCache(framework_cache_path) if framework_cache_path else None
+        with collect_metrics() as mapping_stages:
+            if store is not None:
+                doc_hashes = [results[path]['sha256'] for path in file_paths if results[path]['obligations']]
+                mapped = store.export_framework(framework_path, output_path, doc_hashes, match_controls, index_cache)
+            else:
+                mapped = map_to_framework(all_obligations, framework_path, output_path,
+                                          match_controls=match_controls, index_cache=index_cache)
+        if index_cache is not None:
+            index_cache.close()
+        mapping_seconds = time.perf_counter() - mapping_start
+    else:
+        print("No relevant obligations found.")
+
+    if store is not None:
+        store.close()
+
+    summary = {
+        'started_at': started_at,
+        'framework': framework_path,
+        'output': output_path,
+        'mapped': mapped,
+        'pdf_backend': pdf_backend,
+        'match_controls': match_controls,
+        'parallel_match': parallel_match,
+        'documents': [
+            {
+                'file': path,
+                'clauses': len(results[path]['obligations']),
+                'seconds': round(results[path]['seconds'], 3),
+                'error': results[path]['error'],
+                'cache_hits': results[path]['cache_hits'],
+                'new_clauses': results[path].get('new_clauses'),
+                'stages': results[path]['stages']
+            }
+            for path in file_paths
+        ],
+        'total_documents': len(file_paths),
+        'failed_documents': sum(1 for path in file_paths if results[path]['error']),
+        'total_clauses': len(all_obligations),
+        'cache_hits': sum(result['cache_hits'] for result in results.values()),
+        'cache_misses': sum(result['cache_misses'] for result in results.values()),
+        'mapping_seconds': round(mapping_seconds, 3),
+        'stages': summarize_stages(
+            [stage for path in file_paths for stage in results[path]['stages']] + mapping_stages
+        ),
+        'total_seconds': round(time.perf_counter() - batch_start, 3)
+    }
+
+    with open(summary_path, 'w', encoding='utf-8') as file:
+        json.dump(summary, file, indent=2)
+    print(f"📊 Summary written to {summary_path}")
+
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-process privacy documents into the framework")
+    parser.add_argument('target', help="Directory or glob pattern of PDF/DOCX/TXT documents")
+    parser.add_argument('--framework', default=None,
+                        help="Framework workbook to start from (default: working framework if present, else original)")
+    parser.add_argument('--output', default=WORKING_FRAMEWORK_PATH, help="Where to save the updated framework")
+    parser.add_argument('--summary', default='batch_summary.json', help="Where to write the JSON run summary")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--word-boundaries', action='store_true', help="Only match keywords as whole words")
+    parser.add_argument('--pdf-backend', choices=backends_for('.pdf'), default=PDF_BACKEND,
+                        help="PDF text extraction: layout-aware or fast (default: %(default)s)")
+    parser.add_argument('--parallel-match', action='store_true',
+                        help="Match the keywords of large documents on all cores (for a few very large files)")
+    parser.add_argument('--match-controls', action='store_true',
+                        help="Map each clause to its most similar framework rows (by Keywords) instead of its whole domain")
+    parser.add_argument('--cache', default=CACHE_PATH, help="Extraction cache file (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always re-read and re-extract every document and re-parse the framework")
+    parser.add_argument('--store', default=None,
+                        help="Observation store to append to and export from (default: next to --output, "
+                             "e.g. Working_Framework.observations.sqlite)")
+    parser.add_argument('--no-store', action='store_true', help="Map only this run's clauses, without the store")
+    parser.add_argument('--metrics', default=None, help="Append per-stage timings to this JSON-lines file")
+    parser.add_argument('--verbose', action='store_true', help="Log every updated framework row")
+    args = parser.parse_args(argv)
+    log_level = 'DEBUG' if args.verbose else LOG_LEVEL
+    configure_logging(log_level, args.metrics)
+
+    framework_path = args.framework
+    if framework_path is None:
+        framework_path = args.output if os.path.exists(args.output) else ORIGINAL_FRAMEWORK_PATH
+
+    file_paths = collect_documents(args.target)
+    if not file_paths:
+        print(f"❌ No PDF, DOCX or TXT documents found in '{args.target}'")
+        return 1
+
+    cache_path = None if args.no_cache else args.cache
+    framework_cache_path = None if args.no_cache else FRAMEWORK_CACHE_PATH
+    store_path = None if args.no_store else args.store or store_path_for(args.output)
+    summary = run_batch(file_paths, framework_path, args.output, args.summary, args.workers,
+                        args.word_boundaries, cache_path, store_path, log_level, args.metrics, args.pdf_backend,
+                        args.match_controls, framework_cache_path, args.parallel_match)
+    return 0 if summary['failed_documents'] == 0 and (summary['mapped'] or not summary['total_clauses']) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
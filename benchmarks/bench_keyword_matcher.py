@@ -0,0 +1,85 @@
+# benchmarks/bench_keyword_matcher.py
+"""
+Compare the compiled KeywordMatcher with the original per-keyword loop
+as the number of rules grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_keyword_matcher
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import KEYWORD_CATEGORIES
+from keyword_matcher import KeywordMatcher
+
+RULE_COUNTS = [13, 50, 200, 1000]
+SENTENCE_COUNT = 5000
+
+
+def legacy_match(sentence, keyword_categories):
+    """The original triple loop from extract_obligations"""
+    matches = []
+    for category, keywords in keyword_categories.items():
+        for keyword in keywords:
+            if keyword.lower() in sentence.lower():
+                matches.append((category, keyword))
+                break
+    return matches
+
+
+def build_rules(category_count, rng):
+    """Real categories padded with synthetic ones up to category_count"""
+    rules = dict(KEYWORD_CATEGORIES)
+    syllables = ['pri', 'va', 'cy', 'con', 'sent', 'da', 'ta', 'pro', 'tec', 'tion', 're', 'ten']
+    index = 0
+    while len(rules) < category_count:
+        words = [''.join(rng.choice(syllables) for _ in range(3)) for _ in range(5)]
+        rules[f"synthetic_{index}"] = [f"{word} {rng.choice(syllables)}" for word in words]
+        index += 1
+    return rules
+
+
+def build_sentences(rules, rng):
+    """Sentences that mix rule keywords with filler text"""
+    vocabulary = [keyword for keywords in rules.values() for keyword in keywords]
+    filler = "the organisation will process personal information for lawful purposes".split()
+    sentences = []
+    for _ in range(SENTENCE_COUNT):
+        words = rng.sample(filler, 6) + [rng.choice(vocabulary)]
+        rng.shuffle(words)
+        sentences.append(' '.join(words).capitalize() + '.')
+    return sentences
+
+
+def time_it(func, sentences):
+    start = time.perf_counter()
+    results = [func(sentence) for sentence in sentences]
+    return time.perf_counter() - start, results
+
+
+def run():
+    rng = random.Random(42)
+    print(f"{'categories':>10} {'keywords':>9} {'legacy (s)':>11} {'matcher (s)':>12} {'speedup':>8}")
+
+    for category_count in RULE_COUNTS:
+        rules = build_rules(category_count, rng)
+        sentences = build_sentences(rules, rng)
+        keyword_count = sum(len(keywords) for keywords in rules.values())
+
+        matcher = KeywordMatcher(rules)
+        legacy_time, legacy_results = time_it(lambda s: legacy_match(s, rules), sentences)
+        matcher_time, matcher_results = time_it(matcher.match, sentences)
+
+        if legacy_results != matcher_results:
+            raise AssertionError(f"Matcher results differ from the legacy loop with {category_count} categories")
+
+        speedup = legacy_time / matcher_time if matcher_time else float('inf')
+        print(f"{category_count:>10} {keyword_count:>9} {legacy_time:>11.3f} {matcher_time:>12.3f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
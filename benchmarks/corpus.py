@@ -0,0 +1,143 @@
+# benchmarks/corpus.py
+"""
+Synthetic privacy corpus for the benchmarks: PDF, DOCX and TXT documents of
+a chosen number of pages built from the KEYWORD_CATEGORIES vocabulary, and
+a framework workbook with a chosen number of rows.
+
+Documents are deterministic for a given seed, so timings are comparable
+between runs.
+"""
+import os
+import random
+import sys
+import textwrap
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.enum.text import WD_BREAK
+from openpyxl import Workbook
+
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+from excel_mapper import FRAMEWORK_SHEET
+
+SENTENCES_PER_PAGE = 30
+# Share of sentences that contain a keyword
+KEYWORD_SENTENCE_RATIO = 0.4
+
+_PARTIES = ['The organisation', 'The data controller', 'The processor', 'Each vendor', 'The company',
+            'The service provider', 'Every employee', 'The data user']
+_ACTIONS = ['shall ensure', 'must maintain', 'is required to document', 'will review',
+            'should implement', 'shall not disclose', 'must notify the customer about']
+_FILLER = [
+    'This section describes the general terms of the agreement between the parties.',
+    'The schedule below lists the services covered by this contract.',
+    'Meetings between the parties take place at least once per quarter.',
+    'Invoices are payable within thirty days of receipt.',
+    'The headings in this document are for convenience only.',
+    'Any amendment must be agreed in writing by both parties.',
+    'The project timeline is set out in the statement of work.',
+    'Notices shall be sent to the addresses listed in the first annex.'
+]
+
+
+def make_sentences(count, rng):
+    """Mix of keyword-bearing obligations and neutral filler sentences"""
+    keywords = [keyword for category in KEYWORD_CATEGORIES.values() for keyword in category]
+    sentences = []
+    for _ in range(count):
+        if rng.random() < KEYWORD_SENTENCE_RATIO:
+            sentences.append(f"{rng.choice(_PARTIES)} {rng.choice(_ACTIONS)} {rng.choice(keywords)} "
+                             f"for all personal data it handles in clause {rng.randint(1, 99)}.")
+        else:
+            sentences.append(rng.choice(_FILLER))
+    return sentences
+
+
+def make_pages(page_count, seed=0):
+    """page_count pages of text, each a list of sentences"""
+    rng = random.Random(seed)
+    return [make_sentences(SENTENCES_PER_PAGE, rng) for _ in range(page_count)]
+
+
+def write_txt(path, pages):
+    with open(path, 'w', encoding='utf-8') as file:
+        for sentences in pages:
+            file.write(' '.join(sentences) + '\n\n')
+
+
+def write_docx(path, pages):
+    document = Document()
+    for page_number, sentences in enumerate(pages):
+        if page_number:
+            document.paragraphs[-1].add_run().add_break(WD_BREAK.PAGE)
+        for start in range(0, len(sentences), 5):
+            document.add_paragraph(' '.join(sentences[start:start + 5]))
+    document.save(path)
+
+
+def write_pdf(path, pages):
+    """Minimal PDF writer: one Helvetica text block per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for sentences in pages:
+        lines = textwrap.wrap(' '.join(sentences), 95)
+        content = b"BT /F1 9 Tf 40 770 Td 11 TL " + b" ".join(
+            b"(" + _pdf_escape(line) + b") '" for line in lines
+        ) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+                       b" /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % kid for kid in kids)
+                  + b"] /Count %d >>" % len(kids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, 'wb') as file:
+        file.write(output)
+
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').encode('latin-1', 'replace')
+
+
+WRITERS = {'pdf': write_pdf, 'docx': write_docx, 'txt': write_txt}
+
+
+def write_document(directory, file_format, page_count, seed=0):
+    """Write (or reuse) a synthetic document; returns its path"""
+    path = os.path.join(directory, f"synthetic_{page_count}p_{seed}.{file_format}")
+    if not os.path.exists(path):
+        WRITERS[file_format](path, make_pages(page_count, seed))
+    return path
+
+
+def write_framework(directory, row_count, seed=0):
+    """Write (or reuse) a framework workbook with row_count controls spread over all domains"""
+    path = os.path.join(directory, f"synthetic_framework_{row_count}r_{seed}.xlsx")
+    if os.path.exists(path):
+        return path
+
+    rng = random.Random(seed)
+    categories = list(KEYWORD_CATEGORIES)
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = FRAMEWORK_SHEET
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    for row in range(row_count):
+        category = categories[row % len(categories)]
+        worksheet.append([f"C-{row + 1:04d}", CATEGORY_TO_DOMAIN[category],
+                          rng.choice(KEYWORD_CATEGORIES[category]), None])
+    workbook.save(path)
+    return path
@@ -0,0 +1,268 @@
+# benchmarks/run_benchmarks.py
+"""
+Time each pipeline stage on a synthetic corpus and record throughput and
+peak memory as JSON. Exit with status 1 when a stage got slower (or used
+more memory) than the baseline allows, or when there is no baseline yet. Startup stages time
+each entry point's import, and a cold batch run, in a fresh interpreter.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --pages 10 100 --rows 500
+    python -m benchmarks.run_benchmarks --pages 10 100 --rows 500 --update-baseline
+    python -m benchmarks.run_benchmarks --pages 10 100 --rows 500 --baseline benchmarks/baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from benchmarks.corpus import write_document, write_framework
+from cache import TieredCache
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+from document_reader import read_document, resolve_backend, backends_for
+from extractor import split_into_sentences, extract_obligations
+from excel_mapper import map_to_framework
+
+FORMATS = ['txt', 'docx', 'pdf']
+DEFAULT_PAGES = [10, 100]
+DEFAULT_ROWS = 500
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Entry points whose import time is tracked
+STARTUP_MODULES = ['main', 'batch', 'app', 'observation_summarizer']
+# Dependencies that should only load when a document or stage needs them
+HEAVY_MODULES = ['pandas', 'openpyxl', 'pdfplumber', 'pdfminer', 'spacy', 'docx']
+# Absolute slack so stages that take a few milliseconds don't flag timer noise
+NOISE_SECONDS = 0.01
+NOISE_MB = 0.5
+
+
+def measure(func, repeat):
+    """
+    Best wall time of repeat runs (with tracing off), then one traced run for
+    the peak memory. Returns (seconds, peak_mb, result).
+    """
+    # The pipeline logs its progress instead of printing, and logging is left
+    # unconfigured here, so only warnings and errors reach the console
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
+
+
+def measure_process(command, repeat):
+    """Best wall time of repeat runs of a command in a fresh process; returns (seconds, stdout)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, completed.stdout
+
+
+def record(results, name, seconds, peak_mb, items, unit, **extra):
+    """peak_mb is None for stages run in another process"""
+    results[name] = dict({
+        'seconds': round(seconds, 4),
+        'throughput': round(items / seconds, 1) if seconds else None,
+        'unit': unit,
+        'peak_mb': round(peak_mb, 2) if peak_mb is not None else None
+    }, **extra)
+    peak = f"{peak_mb:>8.1f} MB" if peak_mb is not None else f"{'-':>8}"
+    print(f"{name:<36} {seconds:>9.3f}s {results[name]['throughput'] or 0:>12,.1f} {unit:<14} {peak}")
+
+
+def bench_documents(corpus_dir, formats, page_counts, repeat, results):
+    """
+    read (with every backend of the format) / split / extract per format and
+    size; returns the obligations of the largest document
+    """
+    obligations = []
+    for page_count in page_counts:
+        for file_format in formats:
+            path = write_document(corpus_dir, file_format, page_count)
+            prefix = f"{file_format}/{page_count}p"
+
+            default = resolve_backend(path).name
+            seconds, peak, text = measure(lambda: read_document(path), repeat)
+            record(results, f"{prefix}/read", seconds, peak, page_count, 'pages/s', backend=default)
+            for backend in backends_for(path):
+                if backend != default:
+                    seconds, peak, _ = measure(lambda: read_document(path, backend=backend), repeat)
+                    record(results, f"{prefix}/read-{backend}", seconds, peak, page_count, 'pages/s',
+                           backend=backend)
+
+            seconds, peak, sentences = measure(lambda: split_into_sentences(text), repeat)
+            record(results, f"{prefix}/split", seconds, peak, len(sentences), 'sentences/s')
+
+            seconds, peak, obligations = measure(
+                lambda: extract_obligations(text, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN), repeat)
+            record(results, f"{prefix}/extract", seconds, peak, len(sentences), 'sentences/s',
+                   clauses=len(obligations))
+
+            # Below PARALLEL_MATCH_MIN_BYTES this is the serial path plus the size check
+            seconds, peak, _ = measure(
+                lambda: extract_obligations(text, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, parallel=True), repeat)
+            record(results, f"{prefix}/extract-parallel", seconds, peak, len(sentences), 'sentences/s')
+    return obligations
+
+
+def bench_framework(corpus_dir, row_count, obligations, repeat, results, summarize=True):
+    """map and summarize against a synthetic framework"""
+    framework_path = write_framework(corpus_dir, row_count)
+    with open(framework_path, 'rb') as file:
+        framework_bytes = file.read()
+
+    def map_once(match_controls=False, index_cache=None):
+        output = io.BytesIO()
+        if not map_to_framework(obligations, io.BytesIO(framework_bytes), output, match_controls=match_controls,
+                                index_cache=index_cache):
+            raise RuntimeError("map_to_framework failed")
+        return output.getvalue()
+
+    seconds, peak, mapped = measure(map_once, repeat)
+    record(results, f"framework/{row_count}r/map", seconds, peak, row_count, 'rows/s',
+           clauses=len(obligations))
+    seconds, peak, _ = measure(lambda: map_once(match_controls=True), repeat)
+    record(results, f"framework/{row_count}r/map-controls", seconds, peak, row_count, 'rows/s',
+           clauses=len(obligations))
+
+    # With the framework's index already cached, as on every run after the first
+    index_cache = TieredCache()
+    map_once(index_cache=index_cache)
+    seconds, peak, _ = measure(lambda: map_once(index_cache=index_cache), repeat)
+    record(results, f"framework/{row_count}r/map-indexed", seconds, peak, row_count, 'rows/s',
+           clauses=len(obligations))
+
+    if not summarize:
+        return
+
+    from comprehensive_summarizer import ComprehensiveObservationSummarizer
+    frame = pd.read_excel(io.BytesIO(mapped))
+    summarizer = ComprehensiveObservationSummarizer()
+    try:
+        summarizer.nlp
+    except OSError as e:
+        print(f"⚠️ Skipping summarizer: {e}")
+        return
+
+    # A fresh summarizer per run so its memo doesn't turn later runs into lookups
+    seconds, peak, _ = measure(
+        lambda: ComprehensiveObservationSummarizer().generate_concise_observations(
+            frame['Observation'], frame['Keywords']), repeat)
+    record(results, f"framework/{row_count}r/summarize", seconds, peak, row_count, 'rows/s')
+
+
+def bench_startup(corpus_dir, row_count, repeat, results):
+    """Import time of each entry point, and a cold batch run on a small TXT document"""
+    for module in STARTUP_MODULES:
+        code = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        seconds, output = measure_process([sys.executable, '-c', code], repeat)
+        record(results, f"startup/import-{module}", seconds, None, 1, 'starts/s', heavy_modules=output.split())
+
+    document = write_document(corpus_dir, 'txt', 10)
+    output = os.path.join(corpus_dir, 'startup_framework.xlsx')
+    command = [sys.executable, 'batch.py', document, '--framework', write_framework(corpus_dir, row_count),
+               '--output', output, '--summary', os.path.join(corpus_dir, 'startup_summary.json'),
+               '--no-cache', '--no-store', '--workers', '1']
+    seconds, _ = measure_process(command, repeat)
+    record(results, 'startup/batch-txt', seconds, None, 1, 'runs/s')
+
+
+def find_regressions(results, baseline, tolerance, memory_tolerance):
+    """Stages slower (or bigger) than the baseline allows, as messages"""
+    regressions = []
+    for name, base in baseline.get('stages', {}).items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current['seconds'] > base['seconds'] * (1 + tolerance) + NOISE_SECONDS:
+            regressions.append(f"{name}: {current['seconds']:.3f}s vs baseline {base['seconds']:.3f}s")
+        if current['peak_mb'] is None or base['peak_mb'] is None:
+            continue
+        if current['peak_mb'] > base['peak_mb'] * (1 + memory_tolerance) + NOISE_MB:
+            regressions.append(f"{name}: {current['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic corpus")
+    parser.add_argument('--pages', type=int, nargs='+', default=DEFAULT_PAGES,
+                        help="Document sizes in pages (default: %(default)s)")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="Framework rows (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the best is kept")
+    parser.add_argument('--corpus-dir', default=None, help="Where to write (and reuse) the synthetic corpus")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="Save these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown (default: 25%%)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="Allowed peak memory growth")
+    parser.add_argument('--no-summarizer', action='store_true', help="Skip the summarizer stage")
+    parser.add_argument('--no-startup', action='store_true', help="Skip the startup stages")
+    args = parser.parse_args(argv)
+
+    # Without a baseline there is nothing to gate on, so fail before the run
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"❌ No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 1
+
+    corpus_dir = args.corpus_dir or os.path.join(tempfile.gettempdir(), 'privacy_bench_corpus')
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    results = {}
+    print(f"{'stage':<36} {'time':>10} {'throughput':>12} {'':<14} {'peak':>11}")
+    obligations = bench_documents(corpus_dir, args.formats, sorted(args.pages), args.repeat, results)
+    bench_framework(corpus_dir, args.rows, obligations, args.repeat, results, not args.no_summarizer)
+    if not args.no_startup:
+        bench_startup(corpus_dir, args.rows, args.repeat, results)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'stages': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"📊 Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    regressions = find_regressions(results, baseline, args.tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"❌ Regression: {regression}")
+    if not regressions:
+        print("✅ No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
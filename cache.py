@@ -0,0 +1,228 @@
+# cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_PATH, CACHE_MAX_BYTES
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+def file_sha256(file_path):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def rules_fingerprint(keyword_categories, category_to_domain):
+    """
+    Short hash of the keyword rules. Category order affects the results,
+    so the mappings are hashed in their defined order.
+    """
+    payload = json.dumps([keyword_categories, category_to_domain], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+class DiskCache:
+    """
+    Size-bounded LRU cache stored in a SQLite file.
+
+    Values are JSON-encoded. Several processes can share the same file;
+    least recently used entries are evicted once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached value, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys that are cached"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE entries SET last_access = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [key for key, _ in rows]
+                    )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def put(self, key, value):
+        """Store a value; entries larger than the whole cache are not stored"""
+        return self.put_many({key: value}) == 1
+
+    def put_many(self, items):
+        """Store several values in one transaction; returns how many were stored"""
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            encoded = json.dumps(value, ensure_ascii=False)
+            size = len(encoded.encode('utf-8'))
+            if size <= self.max_bytes:
+                rows.append((key, encoded, size, now))
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+        return len(rows)
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            evicted.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counts for this instance plus the current size of the cache"""
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    In-memory LRU in front of an optional DiskCache.
+
+    Lookups are served from memory first, then from disk (and promoted to
+    memory). Writes go to both tiers.
+    """
+
+    def __init__(self, disk=None, max_entries=10000):
+        self.disk = disk
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+            self.memory_hits += len(found)
+
+        from_disk = self.disk.get_many(missing) if self.disk is not None and missing else {}
+        with self._lock:
+            for key, value in from_disk.items():
+                self._remember(key, value)
+            self.disk_hits += len(from_disk)
+            self.misses += len(missing) - len(from_disk)
+
+        found.update(from_disk)
+        return found
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+        if self.disk is not None and items:
+            self.disk.put_many(items)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        stats = {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'max_entries': self.max_entries
+        }
+        if self.disk is not None:
+            disk_stats = self.disk.stats()
+            stats['disk_entries'] = disk_stats['entries']
+            stats['disk_bytes'] = disk_stats['bytes']
+        return stats
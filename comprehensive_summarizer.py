@@ -1,15 +1,75 @@
 # comprehensive_summarizer.py - COMPLETE VERSION
-import spacy
-import pandas as pd
 from collections import defaultdict
 import re
+import threading
+import hashlib
+import json
+from keyword_matcher import KeywordMatcher
+from cache import DiskCache, TieredCache
+from instrumentation import span
+from config import SUMMARY_CACHE_PATH, SUMMARY_CACHE_MEMORY_ENTRIES
+
+SPACY_MODEL = "en_core_web_sm"
+
+# Bump when the observation builders change, to invalidate cached observations
+SUMMARIZER_VERSION = 1
+
+# Only sentence boundaries are used, so load the model without the parser and
+# the other annotators and switch on its (much cheaper) sentence recognizer.
+# The shared tok2vec only feeds the tagger and parser; senter embeds its own.
+_EXCLUDED_PIPES = ["tok2vec", "parser", "tagger", "attribute_ruler", "lemmatizer", "ner"]
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+# Keyword branches of _build_observation_by_keyword, checked in this order
+_OBSERVATION_BRANCHES = [
+    ('dpo', ['data protection officer', 'dpo']),
+    ('roles', ['role', 'responsibilit']),
+    ('consent', ['consent']),
+    ('security', ['access control', 'encryption', 'firewall', 'antivirus', 'mfa']),
+    ('audit', ['audit', 'assessment', 'impact assessment']),
+    ('rights', ['right to', 'can access', 'allowed to']),
+    ('incident', ['breach', 'incident', 'response']),
+]
+
+# Returned by the observation builders when the spaCy fallback is deferred to a batch
+_NEEDS_SENTENCES = object()
+
+def get_nlp():
+    """
+    Process-wide spaCy pipeline for sentence segmentation, loaded on first use
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                # spaCy takes about a second to import, so only when a row needs it
+                import spacy
+                try:
+                    nlp = spacy.load(SPACY_MODEL, exclude=_EXCLUDED_PIPES)
+                except OSError:
+                    raise OSError("Please install spaCy model: python -m spacy download en_core_web_sm")
+                if 'senter' in nlp.component_names:
+                    nlp.enable_pipe('senter')
+                elif not nlp.has_pipe('sentencizer'):
+                    nlp.add_pipe('sentencizer')
+                _nlp = nlp
+    return _nlp
+
+def _isna(value):
+    # pandas is already loaded whenever cells come from a DataFrame
+    import pandas as pd
+    return pd.isna(value)
+
+def default_summary_cache():
+    """In-memory LRU backed by the on-disk summary cache shared across processes"""
+    return TieredCache(DiskCache(SUMMARY_CACHE_PATH), max_entries=SUMMARY_CACHE_MEMORY_ENTRIES)
 
 class ComprehensiveObservationSummarizer:
-    def __init__(self):
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            raise OSError("Please install spaCy model: python -m spacy download en_core_web_sm")
+    def __init__(self, cache=None):
+        # Optional cache of generated observations (e.g. cache.TieredCache)
+        self.cache = cache
         
         # Define comprehensive keyword patterns
         self.keyword_patterns = {
@@ -89,10 +149,41 @@ class ComprehensiveObservationSummarizer:
                 'monitoring': ['monitor', 'track', 'oversee', 'supervise']
             }
         }
+        
+        self._compile_rules()
+
+    def _compile_rules(self):
+        """
+        Compile the keyword rules once: a multi-term matcher per pattern group,
+        one regex per observation branch, and memo tables for keyword lookups
+        """
+        # Terms are tested against lower-cased text, so a term with capitals never matches
+        self._group_matchers = {
+            pattern_key: KeywordMatcher({
+                category: [term for term in terms if term == term.lower()]
+                for category, terms in patterns.items()
+            })
+            for pattern_key, patterns in self.keyword_patterns.items()
+        }
+        self._branch_patterns = [
+            (branch, re.compile('|'.join(re.escape(term) for term in terms)))
+            for branch, terms in _OBSERVATION_BRANCHES
+        ]
+        self._pattern_key_cache = {}
+        self._branch_cache = {}
+        
+        # Part of every cache key, so edited rules never reuse old observations
+        rules = json.dumps([SUMMARIZER_VERSION, self.keyword_patterns, _OBSERVATION_BRANCHES])
+        self.rules_version = hashlib.sha256(rules.encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def nlp(self):
+        """Shared spaCy pipeline (loaded lazily, only when the sentence fallback is needed)"""
+        return get_nlp()
 
     def preprocess_text(self, text):
         """Clean and preprocess the text - THIS WAS MISSING!"""
-        if pd.isna(text):
+        if _isna(text):
             return ""
         text = re.sub(r'[•\-\*]\s*', '', str(text))
         text = ' '.join(text.split())
@@ -100,93 +191,191 @@ class ComprehensiveObservationSummarizer:
 
     def get_patterns_for_keyword(self, keyword):
         """Find the best matching patterns for a given keyword"""
+        return self.keyword_patterns[self._pattern_key_for_keyword(keyword)]
+    
+    def _pattern_key_for_keyword(self, keyword):
+        """Name of the pattern group for a keyword (memoized; framework keywords repeat)"""
         keyword_lower = keyword.lower().strip()
-        
+        pattern_key = self._pattern_key_cache.get(keyword_lower)
+        if pattern_key is None:
+            pattern_key = self._find_pattern_key(keyword_lower)
+            self._pattern_key_cache[keyword_lower] = pattern_key
+        return pattern_key
+    
+    def _find_pattern_key(self, keyword_lower):
         # Try to find the best match in our patterns
-        for pattern_key, patterns in self.keyword_patterns.items():
+        for pattern_key in self.keyword_patterns:
             if pattern_key in keyword_lower or keyword_lower in pattern_key:
-                return patterns
+                return pattern_key
         
         # Try partial matching for multi-word keywords
-        for pattern_key in self.keyword_patterns.keys():
+        for pattern_key in self.keyword_patterns:
             if any(word in keyword_lower for word in pattern_key.split()) or \
                any(word in pattern_key for word in keyword_lower.split()):
-                return self.keyword_patterns[pattern_key]
+                return pattern_key
         
-        return self.keyword_patterns['default']
+        return 'default'
     
     def extract_key_actions(self, text, keyword):
         """Extract key actions relevant to the specific keyword"""
         responsibilities = defaultdict(list)
-        patterns = self.get_patterns_for_keyword(keyword)
+        pattern_key = self._pattern_key_for_keyword(keyword)
         
-        text_lower = text.lower()
+        # One pass over the text finds every term of the pattern group
+        found = self._group_matchers[pattern_key].find_keywords(text.lower())
+        if not found:
+            return responsibilities
         
         # Check for each responsibility pattern
-        for category, terms in patterns.items():
+        for category, terms in self.keyword_patterns[pattern_key].items():
             for term in terms:
-                if term in text_lower:
+                if term in found:
                     responsibilities[category].append(term)
         
         return responsibilities
     
     def generate_concise_observation(self, raw_observations, keyword):
         """Generate a concise observation tailored to the specific keyword"""
-        if not raw_observations:
+        combined_text = self._combine_observations(raw_observations)
+        if not combined_text.strip():
             return ""
         
-        # Preprocess and combine all observations
-        if isinstance(raw_observations, list):
-            combined_text = ' '.join([self.preprocess_text(obs) for obs in raw_observations])
-        else:
-            combined_text = self.preprocess_text(raw_observations)
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(combined_text, keyword)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
-        if not combined_text.strip():
+        observation = self._summarize(combined_text, keyword)
+        
+        if key is not None:
+            self.cache.put(key, observation)
+        return observation
+    
+    def generate_concise_observations(self, raw_observations, keywords, batch_size=256, n_process=1):
+        """
+        Generate concise observations for a whole Observation/Keywords column.
+        
+        Rows that need the spaCy sentence fallback are collected and parsed
+        together with nlp.pipe (batch_size texts at a time, n_process workers)
+        instead of one nlp() call per row. Returns a list in input order.
+        """
+        with span('summarize') as stage:
+            rows = []
+            for raw_observation, keyword in zip(raw_observations, keywords):
+                keyword = "" if _isna(keyword) else str(keyword)
+                combined_text = self._combine_observations(raw_observation)
+                key = self._cache_key(combined_text, keyword) if self.cache is not None else None
+                rows.append((keyword, combined_text, key))
+            
+            # Look up every cacheable row in one go
+            cached = {}
+            if self.cache is not None:
+                cached = self.cache.get_many(key for _, combined_text, key in rows if combined_text.strip())
+            
+            results = []
+            pending = []
+            new_entries = {}
+            for keyword, combined_text, key in rows:
+                if not combined_text.strip():
+                    observation = ""
+                elif key in cached:
+                    observation = cached[key]
+                elif key in new_entries:
+                    observation = new_entries[key]
+                else:
+                    observation = self._summarize(combined_text, keyword, defer_sentences=True)
+                    if observation is _NEEDS_SENTENCES:
+                        pending.append((len(results), keyword, combined_text[:500], key))
+                    elif key is not None:
+                        new_entries[key] = observation
+                results.append(observation)
+            
+            if pending:
+                docs = self.nlp.pipe((text for _, _, text, _ in pending), batch_size=batch_size, n_process=n_process)
+                for (index, keyword, _, key), doc in zip(pending, docs):
+                    results[index] = self._first_sentence_observation(doc, keyword)
+                    if key is not None:
+                        new_entries[key] = results[index]
+            
+            if new_entries:
+                self.cache.put_many(new_entries)
+            stage.add('rows', len(results))
+            stage.add('parsed', len(pending))
+        
+        return results
+    
+    def _combine_observations(self, raw_observations):
+        """Preprocess and combine all observations into one text"""
+        if not isinstance(raw_observations, list) and _isna(raw_observations):
+            return ""
+        if not raw_observations:
             return ""
         
+        if isinstance(raw_observations, list):
+            return ' '.join([self.preprocess_text(obs) for obs in raw_observations])
+        return self.preprocess_text(raw_observations)
+    
+    def _cache_key(self, combined_text, keyword):
+        """Hash of the normalized observation, the keyword and the rule set version"""
+        payload = '\x00'.join([self.rules_version, keyword, combined_text])
+        return 'summary:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _summarize(self, combined_text, keyword, defer_sentences=False):
         # Extract responsibilities
         responsibilities = self.extract_key_actions(combined_text, keyword)
         
         # Generate observation based on keyword category and extracted responsibilities
-        observation = self._build_observation_by_keyword(keyword, responsibilities, combined_text)
-        
-        return observation
+        return self._build_observation_by_keyword(keyword, responsibilities, combined_text, defer_sentences)
     
-    def _build_observation_by_keyword(self, keyword, responsibilities, full_text):
+    def _build_observation_by_keyword(self, keyword, responsibilities, full_text, defer_sentences=False):
         """Build observation based on keyword category"""
-        keyword_lower = keyword.lower()
+        branch = self._branch_for_keyword(keyword.lower())
         
         # DATA PROTECTION OFFICER
-        if any(kw in keyword_lower for kw in ['data protection officer', 'dpo']):
+        if branch == 'dpo':
             return self._build_dpo_observation(responsibilities)
         
         # ROLES & RESPONSIBILITIES
-        elif 'role' in keyword_lower or 'responsibilit' in keyword_lower:
+        elif branch == 'roles':
             return self._build_roles_observation(responsibilities)
         
         # CONSENT MANAGEMENT
-        elif 'consent' in keyword_lower:
+        elif branch == 'consent':
             return self._build_consent_observation(responsibilities, full_text)
         
         # SECURITY CONTROLS
-        elif any(kw in keyword_lower for kw in ['access control', 'encryption', 'firewall', 'antivirus', 'mfa']):
+        elif branch == 'security':
             return self._build_security_observation(keyword, responsibilities)
         
         # AUDITS & ASSESSMENTS
-        elif any(kw in keyword_lower for kw in ['audit', 'assessment', 'impact assessment']):
+        elif branch == 'audit':
             return self._build_audit_observation(responsibilities)
         
         # INDIVIDUAL RIGHTS
-        elif any(kw in keyword_lower for kw in ['right to', 'can access', 'allowed to']):
+        elif branch == 'rights':
             return self._build_rights_observation(keyword, responsibilities)
         
         # INCIDENT MANAGEMENT
-        elif any(kw in keyword_lower for kw in ['breach', 'incident', 'response']):
+        elif branch == 'incident':
             return self._build_incident_observation(responsibilities)
         
         # DEFAULT OBSERVATION BUILDER
         else:
-            return self._build_general_observation(keyword, responsibilities, full_text)
+            return self._build_general_observation(keyword, responsibilities, full_text, defer_sentences)
+    
+    def _branch_for_keyword(self, keyword_lower):
+        """Which observation builder a keyword uses (memoized)"""
+        branch = self._branch_cache.get(keyword_lower)
+        if branch is None:
+            branch = 'general'
+            for name, pattern in self._branch_patterns:
+                if pattern.search(keyword_lower):
+                    branch = name
+                    break
+            self._branch_cache[keyword_lower] = branch
+        return branch
     
     def _build_dpo_observation(self, responsibilities):
         """Build observation for Data Protection Officer"""
@@ -259,18 +448,24 @@ class ComprehensiveObservationSummarizer:
         else:
             return "Incident management and response framework."
     
-    def _build_general_observation(self, keyword, responsibilities, full_text):
+    def _build_general_observation(self, keyword, responsibilities, full_text, defer_sentences=False):
         """Default observation builder"""
         if responsibilities['implementation']:
             return f"Implementation and maintenance of {keyword}."
         elif responsibilities['monitoring']:
             return f"Ongoing monitoring and oversight of {keyword}."
+        elif defer_sentences:
+            return _NEEDS_SENTENCES
         else:
             # Extract the most relevant sentence as fallback
-            sentences = [sent.text for sent in self.nlp(full_text[:500]).sents]
-            if sentences and len(sentences[0]) > 20:
-                return sentences[0][:150] + ("..." if len(sentences[0]) > 150 else "")
-            return f"Provisions and procedures related to {keyword}."
+            return self._first_sentence_observation(self.nlp(full_text[:500]), keyword)
+    
+    def _first_sentence_observation(self, doc, keyword):
+        """Use the first sentence of a parsed text as the observation"""
+        sentences = [sent.text for sent in doc.sents]
+        if sentences and len(sentences[0]) > 20:
+            return sentences[0][:150] + ("..." if len(sentences[0]) > 150 else "")
+        return f"Provisions and procedures related to {keyword}."
 
 # Test function
 def test_summarizer():
@@ -36,4 +36,60 @@ EXCEL_COLUMNS = {
     'keywords': 'Keywords', 
     'observation': 'Observation',
     'control_ref': 'Control Ref'
-}
\ No newline at end of file
+}
+
+# Framework workbooks used by the CLI entry points
+ORIGINAL_FRAMEWORK_PATH = "Data Protection Framework_PDPA_Malaysia.xlsx"
+WORKING_FRAMEWORK_PATH = "Working_Framework.xlsx"
+
+# Append-only store of extracted clauses, with document provenance. Each
+# output workbook has its own, next to it: Working_Framework.xlsx keeps its
+# clauses in Working_Framework.observations.sqlite
+OBSERVATION_STORE_SUFFIX = ".observations.sqlite"
+
+# On-disk cache of extracted text and obligations
+CACHE_PATH = ".privacy_cache/extraction.sqlite"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Cache of generated concise observations
+SUMMARY_CACHE_PATH = ".privacy_cache/summaries.sqlite"
+SUMMARY_CACHE_MEMORY_ENTRIES = 10000
+
+# Parsed framework workbooks, keyed by content hash (see framework_index)
+FRAMEWORK_CACHE_PATH = ".privacy_cache/frameworks.sqlite"
+FRAMEWORK_CACHE_MEMORY_ENTRIES = 16
+# Per-session scratch directories of the web app
+SCRATCH_ROOT = ".privacy_cache/sessions"
+SCRATCH_MAX_AGE_SECONDS = 6 * 60 * 60
+
+# Background assessment jobs in the web app
+JOB_WORKERS = 2
+JOB_HISTORY = 50
+# Latest partial results a job keeps for display
+JOB_RECENT_ITEMS = 10
+
+# Logging level of the command-line tools, and a JSON-lines file that stage
+# timings are appended to (None: not written)
+LOG_LEVEL = "INFO"
+METRICS_PATH = None
+
+# Text-extraction backend for PDFs: "layout" (pdfplumber, layout-aware) or
+# "fast" (pdfminer text in content order, no layout analysis)
+PDF_BACKEND = "layout"
+
+# Chunk-parallel keyword matching of large documents: below
+# PARALLEL_MATCH_MIN_BYTES of sentence text the serial matcher is used
+# (a process pool costs more than it saves); above it, sentences are sent
+# to the workers in chunks of about MATCH_CHUNK_BYTES
+PARALLEL_MATCH_MIN_BYTES = 4 * 1024 * 1024
+MATCH_CHUNK_BYTES = 1024 * 1024
+
+# Near-identical clauses of a domain (Jaccard similarity of their word
+# shingles at least this) are written as one bullet; None turns it off
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+# Control-level mapping (optional): each clause goes to the CONTROL_TOP_K
+# framework rows whose Keywords are most similar to it (TF-IDF cosine
+# similarity of at least CONTROL_MIN_SIMILARITY)
+CONTROL_TOP_K = 3
+CONTROL_MIN_SIMILARITY = 0.2
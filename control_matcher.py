@@ -0,0 +1,133 @@
+# control_matcher.py
+"""
+Control-level matching: score clauses against the Keywords text of each
+framework row with TF-IDF cosine similarity and keep each clause's best
+rows.
+
+Terms are the words and word pairs of the rows' texts. IDF is computed
+over the rows, so a word that appears in most rows (e.g. "data") counts
+for little. Clauses are vectorized on the same vocabulary and scored in
+batches, one sparse matrix product per batch; the threshold and top-k
+selection work on the product's arrays, without a Python loop per pair.
+"""
+import re
+
+# Clauses scored per sparse product (bounds the memory of the scores)
+MATCH_BATCH = 20000
+
+_WORD = re.compile(r'\w+')
+# Joins a batch of clauses for tokenizing (never part of a word)
+_SEPARATOR = '\x00'
+_TOKEN = re.compile(r'\w+|\x00')
+
+def terms(text):
+    """Lower-cased words and word pairs of a text"""
+    words = _WORD.findall(text.lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+class ControlMatcher:
+    """
+    TF-IDF vectors of the framework rows (control_texts, one string per
+    row; None for empty cells), ready to be matched against clauses
+    """
+
+    def __init__(self, control_texts):
+        import numpy as np
+
+        self.row_count = len(control_texts)
+        self.vocabulary = {}
+        columns = []
+        row_lengths = []
+        for text in control_texts:
+            row_terms = terms(str(text)) if text is not None else []
+            columns.extend(self.vocabulary.setdefault(term, len(self.vocabulary)) for term in row_terms)
+            row_lengths.append(len(row_terms))
+
+        counts = self._counts(np.repeat(np.arange(self.row_count), row_lengths), columns, self.row_count)
+        # Smoothed IDF, as in scikit-learn: log((1 + n) / (1 + df)) + 1
+        document_frequency = np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1 + self.row_count) / (1 + document_frequency)) + 1
+        self.controls = self._weigh(counts)
+
+        # Word pairs are looked up by the columns of their two words
+        # (both are in the vocabulary, since every word of a row is)
+        self._token_columns = dict(self.vocabulary, **{_SEPARATOR: -2})
+        pairs = sorted((self.vocabulary[first] * len(self.vocabulary) + self.vocabulary[second], column)
+                       for term, column in self.vocabulary.items() if ' ' in term
+                       for first, second in [term.split(' ')])
+        self._pair_codes = np.array([code for code, _ in pairs], dtype=np.int64)
+        self._pair_columns = np.array([column for _, column in pairs], dtype=np.int64)
+
+    def _counts(self, rows, columns, row_count):
+        """Term count matrix from the (row, column) of each term occurrence"""
+        import numpy as np
+        from scipy import sparse
+
+        counts = sparse.csr_matrix((np.ones(len(rows)), (rows, np.asarray(columns, dtype=np.int64))),
+                                   shape=(row_count, len(self.vocabulary)))
+        counts.sum_duplicates()
+        return counts
+
+    def _weigh(self, counts):
+        """L2-normalized TF-IDF matrix from a term count matrix"""
+        import numpy as np
+        from scipy import sparse
+
+        counts.data *= self.idf[counts.indices]
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ counts)
+
+    def vectorize(self, texts):
+        """TF-IDF matrix of texts on the rows' vocabulary (other terms can't match and are dropped)"""
+        import numpy as np
+
+        # One regex pass over the batch; separators mark where each text starts
+        tokens = _TOKEN.findall(_SEPARATOR.join(texts).lower())
+        lookup = self._token_columns.get
+        columns = np.array([lookup(token, -1) for token in tokens], dtype=np.int64)
+        text_indices = np.cumsum(columns == -2)
+
+        words = columns >= 0
+        # Adjacent known words of the same text that form a vocabulary pair
+        adjacent = words[:-1] & words[1:]
+        codes = columns[:-1][adjacent] * len(self.vocabulary) + columns[1:][adjacent]
+        positions = np.searchsorted(self._pair_codes, codes).clip(max=max(len(self._pair_codes) - 1, 0))
+        pairs = self._pair_codes[positions] == codes if len(self._pair_codes) else np.zeros(len(codes), dtype=bool)
+
+        rows = np.concatenate([text_indices[words], text_indices[:-1][adjacent][pairs]])
+        columns = np.concatenate([columns[words], self._pair_columns[positions[pairs]]])
+        return self._weigh(self._counts(rows, columns, len(texts)))
+
+    def match(self, texts, top_k, threshold):
+        """
+        Best rows of each text: arrays (text index, row index, similarity)
+        sorted by text, then by descending similarity (ties by row order).
+        At most top_k rows per text, each with a similarity of at least threshold.
+        """
+        import numpy as np
+
+        controls = self.controls.T.tocsr()
+        text_indices, row_indices, scores = [], [], []
+        for start in range(0, len(texts), MATCH_BATCH):
+            similarities = self.vectorize(texts[start:start + MATCH_BATCH]) @ controls
+            similarities.data[similarities.data < max(threshold, 1e-12)] = 0
+            similarities.eliminate_zeros()
+            similarities.sort_indices()
+
+            counts = np.diff(similarities.indptr)
+            batch_rows = np.repeat(np.arange(len(counts)), counts)
+            # Similarities are at most 1, so one key sorts by text, then by
+            # descending similarity; the stable sort keeps ties in row order
+            order = np.argsort(2 * batch_rows - np.minimum(similarities.data, 1), kind='stable')
+            # Position of each entry among its text's entries, best first
+            rank = np.arange(len(order)) - similarities.indptr[batch_rows[order]]
+            keep = order[rank < top_k]
+
+            text_indices.append(batch_rows[keep] + start)
+            row_indices.append(similarities.indices[keep])
+            scores.append(similarities.data[keep])
+
+        if not text_indices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(text_indices), np.concatenate(row_indices), np.concatenate(scores)
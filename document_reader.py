@@ -1,41 +1,402 @@
-import pdfplumber
-from docx import Document
+import multiprocessing
+import os
+import re
+import signal
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import closing
+from functools import lru_cache, partial
+from config import PDF_BACKEND
+from instrumentation import get_logger, span
 
-def read_document(file_path):
+logger = get_logger(__name__)
+
+# pdfplumber and pdfminer are imported when the first PDF is opened, so
+# reading Word and text documents doesn't pay for loading them
+
+# TXT files are streamed in blocks of this many characters
+TEXT_CHUNK_SIZE = 64 * 1024
+
+# Parallel PDF mode: pages are handed to workers in ranges of this size,
+# and any single page taking longer than PDF_PAGE_TIMEOUT seconds is skipped
+PDF_PAGES_PER_TASK = 8
+PDF_PAGE_TIMEOUT = 60
+
+# WordprocessingML elements the DOCX reader turns into text
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = _W + 'p'
+_W_T = _W + 't'
+_W_TAB = _W + 'tab'
+_W_BREAKS = (_W + 'br', _W + 'cr')
+# Header and footer parts of a .docx, e.g. word/header1.xml
+_DOCX_PART = re.compile(r'word/(header|footer)(\d*)\.xml$')
+
+# A named way of turning documents into (page_number, text) pieces.
+# read(file_path) streams the pieces; PDF backends also have open_pdf, which
+# opens a document for page-by-page extraction (used by the parallel reader):
+# the opened PDF has page_count, extract(page_index) -> text, and close().
+ReaderBackend = namedtuple('ReaderBackend', ['name', 'extensions', 'description', 'read', 'open_pdf'])
+
+# Registered backends by name, and the one used for each file type by default
+BACKENDS = {}
+DEFAULT_BACKENDS = {}
+
+def register_backend(name, extensions, read, description, open_pdf=None, default=False):
+    """Add a text-extraction backend for the given file extensions (e.g. ['.pdf'])"""
+    backend = ReaderBackend(name, tuple(extensions), description, read, open_pdf)
+    BACKENDS[name] = backend
+    if default:
+        for extension in backend.extensions:
+            DEFAULT_BACKENDS[extension] = name
+    return backend
+
+def backends_for(file_path):
+    """Names of the backends that can read this file (or extension, e.g. '.pdf')"""
+    extension = _extension(file_path)
+    return [name for name, backend in BACKENDS.items() if extension in backend.extensions]
+
+def resolve_backend(file_path, backend=None):
     """
-    Read text from PDF, Word, or TXT files
+    The backend that reads this file. backend is a backend name, a mapping of
+    extension to name (e.g. {'.pdf': 'fast'}, other types use their default),
+    or None for the defaults.
     """
-    text = ""
-    
-    if file_path.endswith('.pdf'):
+    extension = _extension(file_path)
+    if isinstance(backend, dict):
+        backend = backend.get(extension)
+    name = backend or DEFAULT_BACKENDS.get(extension)
+    if name is None:
+        raise ValueError("Unsupported file format. Please use PDF, DOCX, or TXT.")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown text-extraction backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    if extension not in BACKENDS[name].extensions:
+        raise ValueError(f"The '{name}' backend can't read {extension or 'extensionless'} files")
+    return BACKENDS[name]
+
+def _extension(file_path):
+    if file_path.startswith('.') and '.' not in file_path[1:]:
+        return file_path.lower()
+    return os.path.splitext(file_path)[1].lower()
+
+def iter_document(file_path, **reader_options):
+    """
+    Stream text from PDF, Word, or TXT files piece by piece
+    (one page per PDF page, one paragraph or table-cell paragraph per Word paragraph,
+    fixed-size blocks for TXT).
+    reader_options are those of iter_pages.
+    """
+    pages = iter_pages(file_path, **reader_options)
+    return (text for _, text in pages)
+
+def iter_pages(file_path, backend=None, parallel=False, max_workers=None, page_timeout=PDF_PAGE_TIMEOUT,
+               skipped_pages=None):
+    """
+    Stream (page_number, text) pieces of a document. page_number is the
+    1-based PDF page; Word paragraphs and TXT blocks have no page (None).
+
+    backend picks the text-extraction backend (see resolve_backend), e.g.
+    'fast' for PDFs where keyword matching doesn't need the layout.
+
+    With parallel=True, PDF pages are extracted in a process pool of at most
+    max_workers processes (default: all cores). Pages that fail or exceed
+    page_timeout seconds are skipped and appended to skipped_pages as
+    (page_number, reason).
+    """
+    reader = resolve_backend(file_path, backend)
+    if parallel and reader.open_pdf is not None:
+        return _iter_pdf_parallel(file_path, reader.open_pdf, max_workers, page_timeout, skipped_pages)
+    return reader.read(file_path)
+
+class _PlumberPDF:
+    """pdfplumber's layout-aware text: words ordered and spaced by position"""
+    def __init__(self, file_path):
+        import pdfplumber
+        self._pdf = pdfplumber.open(file_path)
+        self.page_count = len(self._pdf.pages)
+
+    def extract(self, index):
+        page = self._pdf.pages[index]
+        page_text = page.extract_text()
+        # Drop the parsed layout objects so memory stays flat on long PDFs
+        page.close()
+        return page_text
+
+    def close(self):
+        self._pdf.close()
+
+@lru_cache(maxsize=None)
+def _line_text_device_class():
+    from pdfminer.converter import PDFLayoutAnalyzer
+    from pdfminer.layout import LTChar, LTContainer
+
+    class LineTextDevice(PDFLayoutAnalyzer):
+        """
+        Page text in content-stream order without layout analysis: a newline
+        where the baseline moves, a space where the text jumps right
+        """
+        def __init__(self, resources):
+            super().__init__(resources, laparams=None)
+            self.text = ""
+
+        def receive_layout(self, ltpage):
+            pieces = []
+            baseline = right = None
+            containers = [iter(ltpage)]
+            while containers:
+                for item in containers[-1]:
+                    if isinstance(item, LTChar):
+                        if baseline is not None:
+                            if abs(item.matrix[5] - baseline) > item.size / 2:
+                                pieces.append("\n")
+                            elif item.x0 - right > item.size / 4:
+                                pieces.append(" ")
+                        pieces.append(item.get_text())
+                        baseline = item.matrix[5]
+                        right = item.x1
+                    elif isinstance(item, LTContainer):
+                        # Figures: read their text in place, then carry on
+                        containers.append(iter(item))
+                        break
+                else:
+                    containers.pop()
+            self.text = "".join(pieces)
+
+    return LineTextDevice
+
+class _PdfminerPDF:
+    """pdfminer's text in content order; skips the layout analysis pdfplumber runs"""
+    def __init__(self, file_path):
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        self._file = open(file_path, 'rb')
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        except Exception as e:
-            print(f"Error reading PDF: {e}")
+            self._pages = list(PDFPage.create_pages(PDFDocument(PDFParser(self._file))))
+        except Exception:
+            self._file.close()
+            raise
+        resources = PDFResourceManager(caching=True)
+        self._device = _line_text_device_class()(resources)
+        self._interpreter = PDFPageInterpreter(resources, self._device)
+        self.page_count = len(self._pages)
+
+    def extract(self, index):
+        self._interpreter.process_page(self._pages[index])
+        return self._device.text
+
+    def close(self):
+        self._file.close()
+
+def _iter_pdf(file_path, open_pdf=_PlumberPDF):
+    try:
+        with closing(open_pdf(file_path)) as pdf:
+            for index in range(pdf.page_count):
+                page_text = pdf.extract(index)
+                if page_text:
+                    yield index + 1, page_text + "\n"
+    except Exception as e:
+        logger.error(f"Error reading PDF: {e}")
+
+class PageTimeoutError(Exception):
+    pass
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeoutError()
+
+def _is_page_timeout(error):
+    # pdfplumber re-raises parser errors wrapped in its own exception type
+    while error is not None:
+        if isinstance(error, PageTimeoutError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _extract_page_range(file_path, start, end, page_timeout, open_pdf=_PlumberPDF):
+    """
+    Worker process: open the PDF itself and extract pages [start, end).
+    Returns [(page_index, text, error)].
+    """
+    # SIGALRM interrupts a page that hangs; not available on Windows, where
+    # the parent falls back to a timeout on the whole range
+    use_alarm = bool(page_timeout) and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_page_timeout)
+    
+    results = []
+    with closing(open_pdf(file_path)) as pdf:
+        for index in range(start, end):
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                try:
+                    page_text = pdf.extract(index)
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+                results.append((index, page_text, None))
+            except Exception as e:
+                if _is_page_timeout(e):
+                    results.append((index, None, f"timed out after {page_timeout}s"))
+                else:
+                    results.append((index, None, str(e) or type(e).__name__))
+    return results
+
+def _iter_pdf_parallel(file_path, open_pdf, max_workers, page_timeout, skipped_pages):
+    try:
+        with closing(open_pdf(file_path)) as pdf:
+            page_count = pdf.page_count
+    except Exception as e:
+        logger.error(f"Error reading PDF: {e}")
+        return
+    
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    workers = min(max_workers or os.cpu_count() or 1, len(ranges))
+    
+    # Not worth starting a pool for a handful of pages
+    if workers <= 1:
+        yield from _iter_pdf(file_path, open_pdf)
+        return
+    
+    # Spawned, not forked: this runs in the web app's job threads, and
+    # forking a multi-threaded process can deadlock the child
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    hung_worker = False
+    try:
+        futures = [pool.submit(_extract_page_range, file_path, start, end, page_timeout, open_pdf)
+                   for start, end in ranges]
+        
+        # Collect in submission order so pages come back in document order,
+        # while later ranges keep extracting in the background
+        for (start, end), future in zip(ranges, futures):
+            range_timeout = None
+            if page_timeout and not hasattr(signal, 'SIGALRM'):
+                range_timeout = page_timeout * (end - start)
+            try:
+                results = future.result(timeout=range_timeout)
+            except FutureTimeoutError:
+                hung_worker = True
+                results = [(index, None, f"timed out after {page_timeout}s") for index in range(start, end)]
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                results = [(index, None, error) for index in range(start, end)]
             
-    elif file_path.endswith('.docx'):
-        try:
-            doc = Document(file_path)
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-        except Exception as e:
-            print(f"Error reading Word document: {e}")
+            for index, page_text, error in results:
+                if error is not None:
+                    logger.warning(f"⚠️ Skipped page {index + 1} of {file_path}: {error}")
+                    if skipped_pages is not None:
+                        skipped_pages.append((index + 1, error))
+                elif page_text:
+                    yield index + 1, page_text + "\n"
+    finally:
+        # Don't block on a worker that is stuck on a page
+        pool.shutdown(wait=not hung_worker, cancel_futures=True)
+
+def _iter_docx(file_path):
+    """
+    Stream the paragraphs of a .docx straight from its XML parts: headers,
+    the body (including table cells, in document order), then footers.
+    Parsed elements are dropped as soon as they are read, so memory stays
+    flat however long the document is.
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            headers, footers = _docx_header_footer_parts(archive.namelist())
+            for part in headers + ['word/document.xml'] + footers:
+                for text in _iter_docx_part(archive, part):
+                    yield None, text
+    except (zipfile.BadZipFile, KeyError, ET.ParseError, OSError) as e:
+        logger.error(f"Error reading Word document: {e}")
+
+def _docx_header_footer_parts(names):
+    parts = {'header': [], 'footer': []}
+    for name in names:
+        match = _DOCX_PART.match(name)
+        if match:
+            parts[match.group(1)].append((int(match.group(2) or 0), name))
+    return [name for _, name in sorted(parts['header'])], [name for _, name in sorted(parts['footer'])]
+
+def _iter_docx_part(archive, name):
+    """One line of text per paragraph of an XML part (table cells hold paragraphs too)"""
+    # Open paragraphs: text boxes nest paragraphs inside a paragraph
+    paragraphs = []
+    # Open elements, so each finished one can be detached from its parent
+    elements = []
+    with archive.open(name) as part:
+        for event, element in ET.iterparse(part, events=('start', 'end')):
+            if event == 'start':
+                elements.append(element)
+                if element.tag == _W_P:
+                    paragraphs.append([])
+                continue
             
-    elif file_path.endswith('.txt'):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-        except Exception as e:
-            print(f"Error reading text file: {e}")
-    else:
-        raise ValueError("Unsupported file format. Please use PDF, DOCX, or TXT.")
-    
-    return text
+            elements.pop()
+            tag = element.tag
+            if tag == _W_P:
+                yield "".join(paragraphs.pop()) + "\n"
+            elif paragraphs:
+                if tag == _W_T:
+                    paragraphs[-1].append(element.text or "")
+                elif tag == _W_TAB:
+                    paragraphs[-1].append("\t")
+                elif tag in _W_BREAKS:
+                    paragraphs[-1].append("\n")
+            if elements:
+                elements[-1].remove(element)
+
+def _iter_txt(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            while True:
+                block = file.read(TEXT_CHUNK_SIZE)
+                if not block:
+                    break
+                yield None, block
+    except Exception as e:
+        logger.error(f"Error reading text file: {e}")
+
+register_backend('layout', ['.pdf'], partial(_iter_pdf, open_pdf=_PlumberPDF),
+                 "pdfplumber, layout-aware (best fidelity)", open_pdf=_PlumberPDF,
+                 default=PDF_BACKEND == 'layout')
+register_backend('fast', ['.pdf'], partial(_iter_pdf, open_pdf=_PdfminerPDF),
+                 "pdfminer without layout analysis (fastest)", open_pdf=_PdfminerPDF,
+                 default=PDF_BACKEND == 'fast')
+register_backend('docx', ['.docx'], _iter_docx, "Streams the Word XML parts", default=True)
+register_backend('txt', ['.txt'], _iter_txt, "UTF-8 text in blocks", default=True)
+
+def read_document(file_path, **reader_options):
+    """
+    Read text from PDF, Word, or TXT files
+    (reader_options are passed to iter_pages, e.g. backend='fast' or
+    parallel=True for large PDFs)
+    """
+    backend = resolve_backend(file_path, reader_options.get('backend')).name
+    with span('read', backend=backend) as stage:
+        pieces = list(iter_document(file_path, **reader_options))
+        stage.add('chunks', len(pieces))
+        stage.add('characters', sum(len(piece) for piece in pieces))
+    return "".join(pieces)
+
+def read_span(file_path, start, end, **reader_options):
+    """
+    Text between two character offsets of a document (as in read_document),
+    read by streaming instead of keeping the whole text
+    """
+    pieces = []
+    offset = 0
+    for text in iter_document(file_path, **reader_options):
+        text_end = offset + len(text)
+        if text_end > start:
+            pieces.append(text[max(start - offset, 0):end - offset])
+        offset = text_end
+        if offset >= end:
+            break
+    return "".join(pieces)
 
 # Test the function
 if __name__ == "__main__":
-    print("Document reader is working!")
\ No newline at end of file
+    print("Document reader is working!")
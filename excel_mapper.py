@@ -1,22 +1,59 @@
-import pandas as pd
+import logging
 import os
-from config import CATEGORY_TO_DOMAIN
+import re
+import shutil
+from functools import partial
+from config import CATEGORY_TO_DOMAIN, NEAR_DUPLICATE_THRESHOLD, CONTROL_TOP_K, CONTROL_MIN_SIMILARITY
+from framework_index import FRAMEWORK_SHEET, select_sheet, header_columns, load_index, load_index_for_update, \
+    updated_index, store_index
+from near_duplicates import collapse_near_duplicates
+from instrumentation import get_logger, span
 
-def format_observations(obligations):
+logger = get_logger(__name__)
+
+# Suffix of a bullet that stands for several near-identical clauses
+_SIMILAR_SUFFIX = re.compile(r' \(\+\d+ similar\)$')
+
+# pandas and openpyxl are imported where they are used: together they take
+# most of a second to load, and most callers only need one of them
+
+def format_observations(obligations, collapse_threshold=None):
     """
     Format obligations as clean bullet points
     """
+    return format_texts((obs['text'] for obs in obligations), collapse_threshold)
+
+def format_texts(texts, collapse_threshold=None):
+    """
+    Format clause texts as clean bullet points, in first-seen order.
+
+    With a collapse_threshold, near-identical clauses (see near_duplicates)
+    become one bullet, the first of them, ending in "(+N similar)".
+    """
+    return format_groups(_group_texts(texts, collapse_threshold))
+
+def _group_texts(texts, collapse_threshold=None):
+    """Unique texts as [(text, similar count)], near-identical ones collapsed given a threshold"""
     # Get unique obligation texts (remove duplicates)
-    unique_texts = list(set(obs['text'] for obs in obligations))
-    
+    unique_texts = list(dict.fromkeys(texts))
+    if collapse_threshold is None:
+        return [(text, 0) for text in unique_texts]
+    return collapse_near_duplicates(unique_texts, collapse_threshold)
+
+def format_groups(groups):
+    """
+    Format (text, similar count) pairs as bullet points
+    """
     # Clean and truncate long texts
     cleaned_texts = []
-    for text in unique_texts:
+    for text, similar in groups:
         # Remove extra whitespace
         clean_text = ' '.join(text.split())
         # Truncate very long texts but keep meaning
         if len(clean_text) > 150:
             clean_text = clean_text[:147] + '...'
+        if similar:
+            clean_text += f" (+{similar} similar)"
         cleaned_texts.append(clean_text)
     
     # Format as bullet points
@@ -26,93 +63,311 @@ def format_observations(obligations):
         bullet_points = "\n".join([f"• {text}" for text in cleaned_texts])
         return bullet_points
 
-def map_to_framework(obligations, framework_path, output_path):
+def group_observations_by_domain(obligations, collapse_threshold=None):
+    """
+    Format the obligations of each domain once, collapsing near-identical
+    clauses when a collapse_threshold is given.
+    Returns ({domain: bullet text}, {domain: clause count}), domains in first-seen order
+    """
+    texts_by_domain = {}
+    for obs in obligations:
+        texts_by_domain.setdefault(obs['domain'], []).append(obs['text'])
+    with span('collapse', clauses=len(obligations)) as stage:
+        observations = {domain: format_texts(texts, collapse_threshold)
+                        for domain, texts in texts_by_domain.items()}
+        stage.add('bullets', sum(text.count('\n') + 1 for text in observations.values()))
+    counts = {domain: len(texts) for domain, texts in texts_by_domain.items()}
+    return observations, counts
+
+def control_observations(obligations, control_texts, collapse_threshold=None, top_k=CONTROL_TOP_K,
+                         threshold=CONTROL_MIN_SIMILARITY):
+    """
+    Format the obligations of each framework row, given the rows' Keywords
+    texts: every clause goes to the top_k rows most similar to it (see
+    control_matcher). Returns one bullet text per row, None for rows
+    without clauses.
+
+    Near-identical clauses are collapsed once, before matching, and only
+    the first of each group is matched: its near-duplicates would go to the
+    same rows, and each clause is hashed once instead of once per row.
+    """
+    from control_matcher import ControlMatcher
+    with span('collapse', clauses=len(obligations)) as stage:
+        groups = _group_texts((obs['text'] for obs in obligations), collapse_threshold)
+        stage.add('bullets', len(groups))
+    with span('match_controls', clauses=len(groups), rows=len(control_texts)) as stage:
+        clauses, rows, _ = ControlMatcher(control_texts).match([text for text, _ in groups], top_k, threshold)
+        stage.add('assignments', len(clauses))
+    
+    # Assignments are sorted by clause, so each row keeps first-seen order
+    groups_by_row = {}
+    for clause, row in zip(clauses.tolist(), rows.tolist()):
+        groups_by_row.setdefault(row, []).append(groups[clause])
+    return [format_groups(groups_by_row[row]) if row in groups_by_row else None
+            for row in range(len(control_texts))]
+
+def merge_bullets(existing, new):
+    """
+    Combine an existing observation with new bullet points, dropping bullets already present.
+    A bullet whose "(+N similar)" count changed is replaced in place by the new one.
+    """
+    lines = [line for line in str(existing).split('\n') if line.strip()]
+    lines += [line for line in new.split('\n') if line.strip()]
+    merged = {}
+    for line in lines:
+        merged[_SIMILAR_SUFFIX.sub('', line)] = line
+    return '\n'.join(merged.values())
+
+def map_to_framework(obligations, framework_path, output_path, in_place=True, merge=False,
+                     collapse_threshold=NEAR_DUPLICATE_THRESHOLD, match_controls=False, index_cache=None):
     """
     Map extracted obligations to the existing Excel framework
+
+    By default the workbook is updated in place: only the Observation cells
+    that change are written, so other sheets and the client's formatting are
+    kept. in_place=False rewrites the framework sheet through pandas instead.
+
+    Rows that already have an observation are skipped, unless merge=True,
+    in which case new bullets are appended to them without duplicates.
+
+    Near-identical clauses of a domain are written as one bullet (see
+    format_texts); collapse_threshold=None keeps every distinct clause.
+
+    With match_controls=True, clauses are mapped to the individual rows
+    whose Keywords they resemble most (see control_observations) instead of
+    to every row of their domain; the sheet then needs a Keywords column.
+
+    framework_path and output_path may also be file-like objects (e.g. BytesIO),
+    so a workbook can be mapped without touching the disk.
+
+    The rows to update are worked out from the framework's index (see
+    framework_index); the workbook itself is only opened to write them.
+    With an index_cache, a workbook is parsed once, and the index of the
+    updated workbook is cached as well.
     """
     try:
         # Check if input file exists
-        if not os.path.exists(framework_path):
-            print(f"❌ Error: Framework file '{framework_path}' not found!")
+        if _is_path(framework_path) and not os.path.exists(framework_path):
+            logger.error(f"❌ Error: Framework file '{framework_path}' not found!")
             return False
             
         # Check if output file is open in another program
-        if os.path.exists(output_path):
+        if _is_path(output_path) and os.path.exists(output_path):
             try:
                 # Try to open the file to check if it's locked
                 with open(output_path, 'a'):
                     pass
             except PermissionError:
-                print(f"❌ Error: '{output_path}' is open in another program. Please close it and try again.")
+                logger.error(f"❌ Error: '{output_path}' is open in another program. Please close it and try again.")
                 return False
         
-        # Read the Excel file
-        print("Reading Excel framework...")
-        
-        # DEBUG: Check available sheets
-        all_sheets = pd.read_excel(framework_path, sheet_name=None)
-        print(f"Available sheets: {list(all_sheets.keys())}")
-        
-        # Try to read the framework sheet
-        try:
-            df = pd.read_excel(framework_path, sheet_name='Data Protection Framework 1')
-        except:
-            # Try the first sheet if the specific name doesn't work
-            first_sheet_name = list(all_sheets.keys())[0]
-            print(f"Trying first sheet instead: {first_sheet_name}")
-            df = all_sheets[first_sheet_name]
-        
-        print(f"✅ Loaded framework with {len(df)} rows")
-        print(f"Columns in framework: {list(df.columns)}")
-        
-        # Initialize observations column if empty
-        if 'Observation' not in df.columns:
-            df['Observation'] = ''
-        
-        # Initialize Concise_Observation column if it doesn't exist
-        if 'Concise_Observation' not in df.columns:
-            df['Concise_Observation'] = ''
-        
-        # Create a set of found domains from obligations for faster lookup
-        found_domains = set(obligation['domain'] for obligation in obligations)
-        
-        print(f"Found obligations in domains: {found_domains}")
-        print(f"Total obligations to map: {len(obligations)}")
-        
-        # Map obligations to the framework
-        updates_made = 0
-        for index, row in df.iterrows():
-            domain = str(row['Domain']) if pd.notna(row['Domain']) else ""
-            current_observation = str(row['Observation']) if pd.notna(row['Observation']) else ""
+        with span('map', clauses=len(obligations)) as stage:
+            if match_controls:
+                # Rows are matched once their Keywords are read from the index
+                domain_observations, domain_clause_counts = {}, {}
+                row_observations = partial(control_observations, obligations,
+                                           collapse_threshold=collapse_threshold)
+            else:
+                # Format each domain's obligations once, then join them onto the rows by domain
+                domain_observations, domain_clause_counts = group_observations_by_domain(obligations,
+                                                                                         collapse_threshold)
+                row_observations = None
+                logger.debug(f"Found obligations in domains: {set(domain_observations)}")
             
-            # Skip if domain is empty or already has content
-            if not domain or current_observation:
-                continue
+            logger.info(f"Total obligations to map: {len(obligations)}")
             
-            # Check if this domain has any obligations
-            domain_obligations = [obs for obs in obligations if obs['domain'] == domain]
+            workbook = None
+            if in_place:
+                # A new workbook is parsed once, for the index and for writing
+                index, workbook = load_index_for_update(framework_path, index_cache)
+            else:
+                # Read the framework's index, parsing the workbook only if it is new
+                index = load_index(framework_path, index_cache)
+            logger.info(f"✅ Loaded framework with {len(index['domains'])} rows")
+            logger.debug(f"Columns in framework: {list(index['columns'])}")
             
-            if domain_obligations:
-                # Format observations as clean bullet points
-                new_observation = format_observations(domain_obligations)
-                df.at[index, 'Observation'] = new_observation
-                updates_made += 1
-                print(f"✅ Updated row {index + 2} ({domain}): {len(domain_obligations)} clauses")
-        
-        # Save the updated framework
-        print("Saving updated framework...")
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Data Protection Framework 1', index=False)
+            updates = _plan_updates(index, domain_observations, merge, row_observations)
+            if logger.isEnabledFor(logging.DEBUG):
+                updated_rows = {}
+                for row in updates:
+                    updated_rows[index['domains'][row]] = updated_rows.get(index['domains'][row], 0) + 1
+                for domain, rows in updated_rows.items():
+                    logger.debug(f"✅ Updated {rows} rows ({domain}): {domain_clause_counts.get(domain, 0)} clauses")
+            
+            if in_place:
+                _update_workbook_cells(index, updates, framework_path, output_path, index_cache, workbook)
+            else:
+                _rewrite_framework_sheet(index, updates, framework_path, output_path)
+            updates_made = len(updates)
+            stage.add('rows_updated', updates_made)
         
-        print(f"🎉 Success! Updated {updates_made} observations in '{output_path}'")
-        print("Note: Rows without found obligations are left blank for cleaner look.")
+        logger.info(f"🎉 Success! Updated {updates_made} observations in '{_describe(output_path)}'")
+        logger.debug("Note: Rows without found obligations are left blank for cleaner look.")
         return True
         
     except PermissionError as e:
-        print(f"❌ Permission denied: {e}")
+        logger.error(f"❌ Permission denied: {e}")
         return False
     except Exception as e:
-        print(f"❌ Error mapping to framework: {e}")
-        import traceback
-        print(f"Full error details: {traceback.format_exc()}")
-        return False
\ No newline at end of file
+        logger.exception(f"❌ Error mapping to framework: {e}")
+        return False
+
+def _ensure_column(worksheet, columns, name):
+    """Add a header for a missing column; returns (column number, whether it was added)"""
+    if name in columns:
+        return columns[name], False
+    column = worksheet.max_column + 1
+    worksheet.cell(row=1, column=column, value=name)
+    columns[name] = column
+    return column, True
+
+def _plan_updates(index, domain_observations, merge=False, row_observations=None):
+    """
+    New Observation of each data row that changes, as {row: text} in row order.
+    row_observations, if given, turns the rows' Keywords into one bullet text
+    per row and replaces the lookup by domain.
+    """
+    if 'Domain' not in index['columns']:
+        raise ValueError(f"No 'Domain' column in sheet '{index['sheet']}'")
+    
+    # Skip rows whose domain is empty or that have no obligations
+    if row_observations is not None:
+        if 'Keywords' not in index['columns']:
+            raise ValueError(f"No 'Keywords' column in sheet '{index['sheet']}'")
+        candidates = [(row, observation) for row, observation in enumerate(row_observations(index['keywords']))
+                      if observation is not None and index['domains'][row] is not None]
+    else:
+        candidates = sorted((row, observation) for domain, observation in domain_observations.items()
+                            for row in index['rows_by_domain'].get(domain, ()))
+    
+    updates = {}
+    for row, new_observation in candidates:
+        existing = index['observations'][row]
+        # Skip rows that already have content, unless merging
+        if existing not in (None, ''):
+            if not merge:
+                continue
+            new_observation = merge_bullets(existing, new_observation)
+        if existing != new_observation:
+            updates[row] = new_observation
+    return updates
+
+def _update_workbook_cells(index, updates, framework_path, output_path, index_cache=None, workbook=None):
+    """
+    Open the workbook (unless it is given, already loaded) and write only the
+    planned Observation cells ({data row: text}); with an index_cache, cache
+    the written workbook's index
+    """
+    columns = dict(index['columns'])
+    added_columns = 'Observation' not in columns or 'Concise_Observation' not in columns
+    if not updates and not added_columns:
+        if not _same_file(framework_path, output_path):
+            # Nothing changed; copy the file as-is instead of re-serializing it
+            _copy_workbook(framework_path, output_path)
+        return
+    
+    if workbook is None:
+        from openpyxl import load_workbook
+        workbook = load_workbook(framework_path)
+    worksheet = workbook[index['sheet']]
+    
+    # Initialize Observation / Concise_Observation columns if they don't exist
+    observation_column, _ = _ensure_column(worksheet, columns, 'Observation')
+    _ensure_column(worksheet, columns, 'Concise_Observation')
+    for row, observation in updates.items():
+        worksheet.cell(row=row + 2, column=observation_column, value=observation)
+    
+    logger.info("Saving updated framework...")
+    with span('save', rows=worksheet.max_row - 1):
+        workbook.save(output_path)
+    if index_cache is not None:
+        store_index(output_path, updated_index(index, columns, updates), index_cache)
+
+def _rewrite_framework_sheet(index, updates, framework_path, output_path):
+    """
+    Rewrite the framework sheet through pandas with the planned Observation
+    cells (other sheets are not kept)
+    """
+    import pandas as pd
+    df = pd.read_excel(framework_path, sheet_name=index['sheet'])
+    
+    # Initialize Observation / Concise_Observation columns if they don't exist
+    for column in ('Observation', 'Concise_Observation'):
+        if column not in df.columns:
+            df[column] = ''
+    
+    # An all-empty column is read as float; make room for text
+    df['Observation'] = df['Observation'].astype(object)
+    if updates:
+        df.loc[list(updates), 'Observation'] = list(updates.values())
+    
+    # Save the updated framework
+    logger.info("Saving updated framework...")
+    with span('save', rows=len(df)), pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name=FRAMEWORK_SHEET, index=False)
+
+def read_framework_sheet(source):
+    """
+    The framework sheet of a workbook (path or file-like) as a DataFrame,
+    chosen like select_sheet: by name, else the first sheet
+    """
+    import pandas as pd
+    with pd.ExcelFile(source, engine='openpyxl') as workbook:
+        sheet = FRAMEWORK_SHEET if FRAMEWORK_SHEET in workbook.sheet_names else workbook.sheet_names[0]
+        return workbook.parse(sheet)
+
+def update_framework_column(framework_path, column_name, values, output_path=None):
+    """
+    Write one column of the framework sheet in place (e.g. Concise_Observation).
+    values are in data-row order, as in the DataFrame of read_framework_sheet;
+    only cells whose value changes are written. Paths or file-like objects
+    (e.g. BytesIO) are accepted.
+    """
+    from openpyxl import load_workbook
+    import pandas as pd
+    output_path = output_path or framework_path
+    workbook = load_workbook(framework_path)
+    worksheet = select_sheet(workbook)
+    columns = header_columns(cell.value for cell in worksheet[1])
+    column, added = _ensure_column(worksheet, columns, column_name)
+    
+    changed = 0
+    cells = worksheet.iter_rows(min_row=2, max_row=len(values) + 1, min_col=column, max_col=column)
+    for (cell,), value in zip(cells, values):
+        if value == '' or (not isinstance(value, str) and pd.isna(value)):
+            value = None
+        if cell.value != value:
+            cell.value = value
+            changed += 1
+    
+    if changed or added or not _same_file(framework_path, output_path):
+        with span('save', rows=worksheet.max_row - 1):
+            workbook.save(output_path)
+    return changed
+
+def _is_path(target):
+    return isinstance(target, (str, os.PathLike))
+
+def _describe(target):
+    return target if _is_path(target) else 'memory'
+
+def _same_file(first, second):
+    if _is_path(first) and _is_path(second):
+        return os.path.abspath(first) == os.path.abspath(second)
+    return first is second
+
+def _copy_workbook(source, destination):
+    """Copy a workbook between paths and/or file-like objects"""
+    if _is_path(source) and _is_path(destination):
+        shutil.copyfile(source, destination)
+        return
+    source_file = open(source, 'rb') if _is_path(source) else source
+    destination_file = open(destination, 'wb') if _is_path(destination) else destination
+    try:
+        source_file.seek(0)
+        shutil.copyfileobj(source_file, destination_file)
+    finally:
+        if source_file is not source:
+            source_file.close()
+        if destination_file is not destination:
+            destination_file.close()
@@ -1,41 +1,299 @@
+import multiprocessing
+import os
 import re
-from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, PARALLEL_MATCH_MIN_BYTES, MATCH_CHUNK_BYTES
+from keyword_matcher import get_matcher
+from instrumentation import get_logger, span
+
+logger = get_logger(__name__)
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+# Sentences this short (after normalizing whitespace) are dropped
+MIN_SENTENCE_LENGTH = 10
+
+# A sentence with its provenance: the page it starts on (None outside PDFs)
+# and its character span in the document text, as returned by read_document
+Sentence = namedtuple('Sentence', ['text', 'page', 'start', 'end'])
+
+def _sentence_at(buffer, start, end):
+    """
+    (text, start, end) of the sentence in buffer[start:end] with surrounding
+    whitespace trimmed from the span, or None if it is too short. Whitespace
+    inside is only normalized (copying the text again) when it needs to be.
+    """
+    while start < end and buffer[start].isspace():
+        start += 1
+    while end > start and buffer[end - 1].isspace():
+        end -= 1
+    if end - start <= MIN_SENTENCE_LENGTH:
+        return None
+    
+    text = buffer[start:end]
+    # Printable text has no whitespace but plain spaces: a cheap test that
+    # skips normalizing most sentences
+    if not text.isprintable() or '  ' in text:
+        text = ' '.join(text.split())
+        if len(text) <= MIN_SENTENCE_LENGTH:
+            return None
+    return text, start, end
+
+class Obligation:
+    """
+    One matched clause. A compact record (no per-instance dict) that reads
+    like the dicts the tool used before: obligation['domain'], .get(), keys().
+
+    Category, keyword and domain are interned, so every clause of a category
+    shares the same strings; the clauses of a sentence matching several
+    categories share its text.
+    """
+    __slots__ = ('text', 'category', 'matched_keyword', 'domain', 'page', 'start', 'end')
+
+    def __init__(self, text, category, matched_keyword, domain, page=None, start=None, end=None):
+        self.text = text
+        self.category = sys.intern(category)
+        self.matched_keyword = sys.intern(matched_keyword)
+        self.domain = sys.intern(domain)
+        # Provenance: PDF page and character span in the document text
+        self.page = page
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def from_dict(cls, values):
+        # Through __init__, so values decoded from the cache are interned too
+        return cls(values['text'], values['category'], values['matched_keyword'], values['domain'],
+                   values.get('page'), values.get('start'), values.get('end'))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def _values(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, Obligation):
+            return self._values() == other._values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __repr__(self):
+        return f"Obligation({self.to_dict()!r})"
+
+def iter_sentence_spans(chunks):
+    """
+    Stream Sentence(text, page, start, end) from an iterable of text chunks:
+    strings, or (page, text) pairs as produced by iter_pages.
+    One pass over the text; a sentence cut off at the end of one chunk is
+    carried into the next. The carried pieces are only joined once a
+    boundary turns up, so long stretches without one stay linear.
+    """
+    pending = []
+    pending_length = 0
+    # Last two characters of the pending text: a boundary can start right after it
+    tail = ""
+    carry_offset = 0
+    document_offset = 0
+    # (document offset, page) where the pages overlapping the carry begin
+    pages = []
+    
+    for chunk in chunks:
+        page, text = (None, chunk) if isinstance(chunk, str) else chunk
+        if not pages or pages[-1][1] != page:
+            pages.append((document_offset, page))
+        document_offset += len(text)
+        
+        # Only the new text is scanned (the pending text holds no boundary)
+        window = tail + text
+        if not SENTENCE_BOUNDARY.search(window, max(len(tail) - 1, 0)):
+            if text:
+                pending.append(text)
+                pending_length += len(text)
+                tail = window[-2:]
+        else:
+            buffer = "".join(pending) + text
+            start = 0
+            for boundary in SENTENCE_BOUNDARY.finditer(buffer, max(pending_length - 1, 0)):
+                sentence = _sentence_at(buffer, start, boundary.start())
+                if sentence:
+                    yield _locate(sentence, carry_offset, pages)
+                start = boundary.end()
+            carry = buffer[start:]
+            pending = [carry] if carry else []
+            pending_length = len(carry)
+            tail = carry[-2:]
+            carry_offset += start
+        
+        # Forget pages that end before the carry
+        while len(pages) > 1 and pages[1][0] <= carry_offset:
+            pages.pop(0)
+    
+    carry = "".join(pending)
+    sentence = _sentence_at(carry, 0, len(carry))
+    if sentence:
+        yield _locate(sentence, carry_offset, pages)
+
+def _locate(sentence, buffer_offset, pages):
+    text, start, end = sentence
+    start += buffer_offset
+    page = None
+    for page_offset, page_number in pages:
+        if page_offset > start:
+            break
+        page = page_number
+    return Sentence(text, page, start, end + buffer_offset)
+
+def iter_sentences(chunks):
+    """
+    Stream sentences from an iterable of text chunks (pages, paragraphs, blocks).
+    A sentence cut off at the end of one chunk is carried into the next.
+    """
+    for sentence in iter_sentence_spans(chunks):
+        yield sentence.text
 
 def split_into_sentences(text):
     """
     Simple sentence splitter (no NLTK required)
     """
-    sentences = re.split(r'(?<=[.!?])\s+', text)
+    return list(iter_sentences([text]))
+
+def iter_obligations(sentences, keyword_categories, category_to_domain, word_boundaries=False, parallel=False,
+                     max_workers=None, min_bytes=None, chunk_bytes=None):
+    """
+    Yield obligations from a stream of sentences as soon as they are matched.
+    Sentences are strings or Sentence records, whose page and span are kept.
+
+    With parallel=True, once more than min_bytes of sentence text has been
+    seen, sentences are matched in a process pool of at most max_workers
+    processes (default: all cores), in chunks of about chunk_bytes
+    (defaults: PARALLEL_MATCH_MIN_BYTES and MATCH_CHUNK_BYTES).
+    Obligations come out in the same order as the serial matcher's.
+    Sizes are counted in characters, which is the byte count for ASCII text.
+    """
+    if parallel and (max_workers or os.cpu_count() or 1) > 1:
+        return _iter_obligations_parallel(sentences, keyword_categories, category_to_domain, word_boundaries,
+                                          max_workers, min_bytes or PARALLEL_MATCH_MIN_BYTES,
+                                          chunk_bytes or MATCH_CHUNK_BYTES)
+    return _iter_obligations(sentences, keyword_categories, category_to_domain, word_boundaries)
+
+def _iter_obligations(sentences, keyword_categories, category_to_domain, word_boundaries):
+    matcher = get_matcher(keyword_categories, word_boundaries)
     
-    clean_sentences = []
     for sentence in sentences:
-        sentence = sentence.strip()
-        sentence = re.sub(r'\s+', ' ', sentence)
-        if len(sentence) > 10:
-            clean_sentences.append(sentence)
+        if isinstance(sentence, str):
+            text, page, start, end = sentence, None, None, None
+        else:
+            text, page, start, end = sentence
+        for category, keyword in matcher.match(text):
+            domain = category_to_domain.get(category, 'Unknown')
+            yield Obligation(text, category, keyword, domain, page, start, end)
+
+def _match_texts(texts, keyword_categories, word_boundaries):
+    """
+    Worker process: [(index, category, keyword)] for a chunk of sentence texts.
+    Only the texts travel to the worker and only the matches come back.
+    """
+    matcher = get_matcher(keyword_categories, word_boundaries)
+    return [(index, category, keyword)
+            for index, text in enumerate(texts)
+            for category, keyword in matcher.match(text)]
+
+def _sentence_chunks(sentences, chunk_bytes):
+    chunk = []
+    size = 0
+    for sentence in sentences:
+        chunk.append(sentence)
+        size += len(sentence if isinstance(sentence, str) else sentence[0])
+        if size >= chunk_bytes:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+def _chunk_obligations(chunk, matches, category_to_domain):
+    for index, category, keyword in matches:
+        sentence = chunk[index]
+        if isinstance(sentence, str):
+            sentence = (sentence, None, None, None)
+        text, page, start, end = sentence
+        yield Obligation(text, category, keyword, category_to_domain.get(category, 'Unknown'), page, start, end)
+
+def _iter_obligations_parallel(sentences, keyword_categories, category_to_domain, word_boundaries,
+                               max_workers, min_bytes, chunk_bytes):
+    # Hold back the first min_bytes of text: a stream that ends before
+    # that is matched serially, without starting a pool
+    sentences = iter(sentences)
+    head = []
+    size = 0
+    for sentence in sentences:
+        head.append(sentence)
+        size += len(sentence if isinstance(sentence, str) else sentence[0])
+        if size > min_bytes:
+            break
+    else:
+        yield from _iter_obligations(head, keyword_categories, category_to_domain, word_boundaries)
+        return
     
-    return clean_sentences
+    workers = max_workers or os.cpu_count() or 1
+    remaining = _chain(head, sentences)
+    # Spawned, not forked: the pool may be started from a thread of the web
+    # app, and forking a multi-threaded process can deadlock the child
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        # A few chunks in flight per worker keeps them busy without
+        # holding the whole document's chunks in memory
+        pending = deque()
+        for chunk in _sentence_chunks(remaining, chunk_bytes):
+            texts = [sentence if isinstance(sentence, str) else sentence[0] for sentence in chunk]
+            pending.append((chunk, pool.submit(_match_texts, texts, keyword_categories, word_boundaries)))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield from _chunk_obligations(chunk, future.result(), category_to_domain)
+        while pending:
+            chunk, future = pending.popleft()
+            yield from _chunk_obligations(chunk, future.result(), category_to_domain)
+
+def _chain(head, rest):
+    yield from head
+    yield from rest
 
-def extract_obligations(full_text, keyword_categories, category_to_domain):
+def extract_obligations(full_text, keyword_categories, category_to_domain, word_boundaries=False, parallel=False,
+                        max_workers=None):
     """
     Extract sentences and map them to domains
+
+    Set word_boundaries=True to only match keywords as whole words
+    (e.g. "agree" will no longer match inside "disagree").
+    Set parallel=True to match large texts on several cores (see iter_obligations).
     """
-    obligations = []
-    sentences = split_into_sentences(full_text)
-    
-    print(f"Checking {len(sentences)} sentences for keywords...")
+    with span('split') as stage:
+        sentences = list(iter_sentence_spans([full_text]))
+        stage.add('sentences', len(sentences))
     
-    for sentence in sentences:
-        for category, keywords in keyword_categories.items():
-            for keyword in keywords:
-                if keyword.lower() in sentence.lower():
-                    domain = category_to_domain.get(category, 'Unknown')
-                    obligations.append({
-                        'text': sentence,
-                        'category': category,
-                        'matched_keyword': keyword,
-                        'domain': domain
-                    })
-                    break
+    logger.info(f"Checking {len(sentences)} sentences for keywords...")
     
+    with span('match', sentences=len(sentences)) as stage:
+        obligations = list(iter_obligations(sentences, keyword_categories, category_to_domain, word_boundaries,
+                                            parallel, max_workers))
+        stage.add('clauses', len(obligations))
     return obligations
\ No newline at end of file
@@ -0,0 +1,158 @@
+# framework_index.py
+"""
+Compact, pre-indexed form of a framework workbook.
+
+Parsing the xlsx is the slow part of reading the framework, and the
+template rarely changes. An index keeps what mapping needs: the sheet and
+its header columns, and for each data row its Domain, normalized Keywords
+and current Observation, with the rows of each Domain grouped. Indexes are
+cached under the workbook's SHA-256, so a workbook is parsed once; the
+file itself is only opened again to write the mapped cells.
+"""
+import hashlib
+import os
+
+from cache import DiskCache, TieredCache, file_sha256
+from config import FRAMEWORK_CACHE_PATH, FRAMEWORK_CACHE_MEMORY_ENTRIES
+from instrumentation import get_logger, span
+
+logger = get_logger(__name__)
+
+FRAMEWORK_SHEET = 'Data Protection Framework 1'
+
+# Bumped when the index layout changes, so older cached indexes are ignored
+INDEX_VERSION = 1
+
+def default_index_cache():
+    """In-memory LRU backed by the on-disk framework index cache"""
+    return TieredCache(DiskCache(FRAMEWORK_CACHE_PATH), max_entries=FRAMEWORK_CACHE_MEMORY_ENTRIES)
+
+def select_sheet(workbook):
+    """Framework sheet by name, falling back to the first sheet"""
+    logger.debug(f"Available sheets: {workbook.sheetnames}")
+    if FRAMEWORK_SHEET in workbook.sheetnames:
+        return workbook[FRAMEWORK_SHEET]
+    logger.info(f"Trying first sheet instead: {workbook.sheetnames[0]}")
+    return workbook.worksheets[0]
+
+def header_columns(header):
+    """Map header names (the values of the first row) to column numbers"""
+    columns = {}
+    for column, value in enumerate(header, 1):
+        if value is not None:
+            columns.setdefault(str(value).strip(), column)
+    return columns
+
+def normalize_keywords(value):
+    """Keywords cell as lower-case text with single spaces, None when empty"""
+    if value is None:
+        return None
+    return ' '.join(str(value).lower().split()) or None
+
+def workbook_sha256(source):
+    """SHA-256 of a workbook given as a path or a file-like object"""
+    if isinstance(source, (str, os.PathLike)):
+        return file_sha256(source)
+    position = source.tell()
+    source.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: source.read(1024 * 1024), b''):
+        digest.update(block)
+    source.seek(position)
+    return digest.hexdigest()
+
+def build_index(source):
+    """Parse the framework sheet of a workbook (path or file-like) into an index"""
+    from openpyxl import load_workbook
+    position = None if isinstance(source, (str, os.PathLike)) else source.tell()
+    # Read-only mode streams the sheet instead of building every cell object
+    workbook = load_workbook(source, read_only=True)
+    try:
+        return index_workbook(workbook)
+    finally:
+        workbook.close()
+        if position is not None:
+            source.seek(position)
+
+def index_workbook(workbook):
+    """
+    Index of the framework sheet of an open workbook, a JSON-serializable
+    dict. Data row i is sheet row i + 2.
+    """
+    worksheet = select_sheet(workbook)
+    rows = worksheet.iter_rows(values_only=True)
+    columns = header_columns(next(rows, ()))
+    positions = [columns[name] - 1 if name in columns else None
+                 for name in ('Domain', 'Keywords', 'Observation')]
+
+    domains, keywords, observations = [], [], []
+    for values in rows:
+        domain, keyword, observation = (values[position] if position is not None and position < len(values)
+                                        else None for position in positions)
+        domains.append(str(domain) if domain is not None else None)
+        keywords.append(normalize_keywords(keyword))
+        observations.append(str(observation) if observation is not None else None)
+
+    rows_by_domain = {}
+    for row, domain in enumerate(domains):
+        if domain is not None:
+            rows_by_domain.setdefault(domain, []).append(row)
+    return {
+        'sheet': worksheet.title,
+        'columns': columns,
+        'domains': domains,
+        'keywords': keywords,
+        'observations': observations,
+        'rows_by_domain': rows_by_domain
+    }
+
+def load_index(source, cache=None):
+    """
+    Index of a workbook (path or file-like), parsed only when the cache
+    has no index for its contents yet
+    """
+    key = _index_key(workbook_sha256(source))
+    index = cache.get(key) if cache is not None else None
+    if index is None:
+        with span('index_framework') as stage:
+            index = build_index(source)
+            stage.add('rows', len(index['domains']))
+        if cache is not None:
+            cache.put(key, index)
+    return index
+
+def load_index_for_update(source, cache=None):
+    """
+    Index of a workbook that is about to be written, as (index, workbook).
+    When the cache has no index, the workbook is loaded once for writing
+    and indexed from there; otherwise workbook is None and the file is only
+    opened if there is something to write.
+    """
+    key = index = None
+    if cache is not None:
+        key = _index_key(workbook_sha256(source))
+        index = cache.get(key)
+    if index is not None:
+        return index, None
+    from openpyxl import load_workbook
+    with span('index_framework') as stage:
+        workbook = load_workbook(source)
+        index = index_workbook(workbook)
+        stage.add('rows', len(index['domains']))
+    if cache is not None:
+        cache.put(key, index)
+    return index, workbook
+
+def updated_index(index, columns, observations):
+    """Index after writing observations ({data row: text}) into a sheet with these header columns"""
+    rows = list(index['observations'])
+    for row, observation in observations.items():
+        rows[row] = observation
+    return dict(index, columns=dict(columns), observations=rows)
+
+def store_index(target, index, cache):
+    """Cache the index of a workbook just written to target, so using it next time doesn't parse it"""
+    cache.put(_index_key(workbook_sha256(target)), index)
+
+def _index_key(workbook_hash):
+    return f"framework:{INDEX_VERSION}:{workbook_hash}"
@@ -0,0 +1,186 @@
+# instrumentation.py
+"""
+Logging and per-stage timing.
+
+Modules log through get_logger(__name__) instead of printing. Stages are
+timed with span() (a block of work) or timed_iter() (a lazy stage of a
+generator pipeline). Each finished stage produces a record like
+
+    {"stage": "match", "seconds": 0.41, "sentences": 12000, "sentences_per_s": 29268.3}
+
+which is appended as a JSON line to the metrics file (set_metrics_path /
+METRICS_PATH) and to any collect_metrics() lists active in the current
+thread. With neither, spans are no-ops.
+
+String values are labels rather than counters, e.g. the text-extraction
+backend of a read: {"stage": "read", "backend": "fast", ...}.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_PATH, LOG_LEVEL
+
+LOGGER_NAME = 'privacy_tool'
+
+_metrics_path = METRICS_PATH
+_metrics_lock = threading.Lock()
+_collectors = contextvars.ContextVar('metric_collectors', default=())
+
+def get_logger(name):
+    """Logger under the tool's namespace, e.g. get_logger(__name__)"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+def configure_logging(level=LOG_LEVEL, metrics_path=None):
+    """
+    Console logging for the command-line entry points: plain messages on
+    stdout at INFO, as the tool used to print them
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    if metrics_path is not None:
+        set_metrics_path(metrics_path)
+
+def set_metrics_path(path):
+    """Append stage records to this JSON-lines file (None turns the file off)"""
+    global _metrics_path
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    _metrics_path = path or None
+
+def metrics_enabled():
+    return _metrics_path is not None or bool(_collectors.get())
+
+@contextmanager
+def collect_metrics():
+    """Collect the stage records emitted in this thread (and context) into a list"""
+    records = []
+    token = _collectors.set(_collectors.get() + (records,))
+    try:
+        yield records
+    finally:
+        _collectors.reset(token)
+
+def emit(stage, seconds, counters):
+    record = {'stage': stage, 'seconds': round(seconds, 6)}
+    for name, value in counters.items():
+        record[name] = value
+        if seconds > 0 and not isinstance(value, str):
+            record[f"{name}_per_s"] = round(value / seconds, 1)
+
+    for records in _collectors.get():
+        records.append(record)
+    if _metrics_path is not None:
+        line = json.dumps(dict(record, time=round(time.time(), 3), pid=os.getpid()))
+        with _metrics_lock, open(_metrics_path, 'a', encoding='utf-8') as file:
+            file.write(line + '\n')
+    return record
+
+def summarize_stages(records):
+    """
+    Combine stage records by stage name and labels (in first-seen order):
+    seconds and counters are summed and the rates recomputed from the totals
+    """
+    totals = {}
+    for record in records:
+        labels = {name: value for name, value in record.items() if name != 'stage' and isinstance(value, str)}
+        key = (record['stage'],) + tuple(sorted(labels.items()))
+        total = totals.setdefault(key, dict({'stage': record['stage'], 'seconds': 0.0}, **labels))
+        total['seconds'] += record['seconds']
+        for name, value in record.items():
+            if name not in labels and name not in ('stage', 'seconds', 'time', 'pid') and not name.endswith('_per_s'):
+                total[name] = total.get(name, 0) + value
+
+    summary = []
+    for total in totals.values():
+        seconds = total['seconds']
+        for name in [name for name in total if name not in ('stage', 'seconds')]:
+            if seconds > 0 and not isinstance(total[name], str):
+                total[f"{name}_per_s"] = round(total[name] / seconds, 1)
+        total['seconds'] = round(seconds, 6)
+        summary.append(total)
+    return summary
+
+class Span:
+    """A running stage; add() bumps its counters"""
+    __slots__ = ('stage', 'counters')
+
+    def __init__(self, stage, counters):
+        self.stage = stage
+        self.counters = counters
+
+    def add(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+class _DisabledSpan:
+    __slots__ = ()
+
+    def add(self, counter, amount=1):
+        pass
+
+_DISABLED_SPAN = _DisabledSpan()
+
+@contextmanager
+def span(stage, **counters):
+    """Time a block of work as one stage"""
+    if not metrics_enabled():
+        yield _DISABLED_SPAN
+        return
+
+    current = Span(stage, counters)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        emit(stage, time.perf_counter() - start, current.counters)
+
+def timed_iter(stage, items, counter, inner=None, **labels):
+    """
+    Time a lazy pipeline stage: only the time spent producing its items is
+    counted, minus the time of the inner timed stage it pulls from (if given),
+    so read, split and match report their own share of a streamed document.
+    The record is emitted when the stage is exhausted or closed.
+    """
+    if not metrics_enabled():
+        return items
+    return TimedIterator(stage, items, counter, inner, labels)
+
+class TimedIterator:
+    def __init__(self, stage, items, counter, inner=None, labels=None):
+        self.stage = stage
+        self.counter = counter
+        self.labels = labels or {}
+        self.inner = inner if isinstance(inner, TimedIterator) else None
+        self.seconds = 0.0
+        self._items = items
+
+    def __iter__(self):
+        return self._run()
+
+    def _run(self):
+        iterator = iter(self._items)
+        count = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.seconds += time.perf_counter() - start
+                    return
+                self.seconds += time.perf_counter() - start
+                count += 1
+                yield item
+        finally:
+            own = self.seconds - (self.inner.seconds if self.inner is not None else 0.0)
+            emit(self.stage, max(own, 0.0), dict(self.labels, **{self.counter: count}))
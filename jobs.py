@@ -0,0 +1,177 @@
+# jobs.py
+import atexit
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import JOB_WORKERS, JOB_HISTORY, JOB_RECENT_ITEMS
+from instrumentation import get_logger, collect_metrics
+
+logger = get_logger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Exit hooks that run before the interpreter waits for worker threads;
+# atexit handlers only run after that
+_register_exit = getattr(threading, '_register_atexit', atexit.register)
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    """
+    One background task with live progress.
+
+    The task receives the job and reports through it: advance() bumps a
+    progress counter (and is where cancellation is noticed), add_items()
+    publishes partial results as they are found; only the latest
+    max_items are kept, with item_count counting all of them. Stage
+    timings recorded while the task runs are collected in stages.
+    """
+
+    def __init__(self, title, max_items=JOB_RECENT_ITEMS):
+        self.id = uuid.uuid4().hex[:12]
+        self.title = title
+        self.status = QUEUED
+        self.stage = "Waiting for a worker"
+        self.progress = {}
+        self.items = deque(maxlen=max_items)
+        self.item_count = 0
+        self.warnings = []
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def set_stage(self, stage):
+        self.check_cancelled()
+        self.stage = stage
+
+    def advance(self, counter, amount=1):
+        """Add to a progress counter; raises JobCancelled once cancel() was called"""
+        self.check_cancelled()
+        with self._lock:
+            self.progress[counter] = self.progress.get(counter, 0) + amount
+
+    def add_items(self, items):
+        with self._lock:
+            self.items.extend(items)
+            self.item_count += len(items)
+
+    def warn(self, message):
+        with self._lock:
+            self.warnings.append(message)
+
+    def snapshot(self):
+        """Consistent copy of the job's state for display"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'title': self.title,
+                'status': self.status,
+                'stage': self.stage,
+                'progress': dict(self.progress),
+                'items': list(self.items),
+                'item_count': self.item_count,
+                'warnings': list(self.warnings),
+                'stages': list(self.stages),
+                'error': self.error,
+                'seconds': (self.finished_at or time.time()) - (self.started_at or self.created_at)
+            }
+
+class JobManager:
+    """
+    Runs jobs on a local thread pool and keeps them by ID, so a page can
+    come back to a job that is still running. Only the latest max_history
+    finished jobs are kept. Jobs still running when the process exits are
+    cancelled, so they don't hold up the exit.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_history=JOB_HISTORY):
+        self.max_history = max_history
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        _register_exit(self.shutdown)
+
+    def submit(self, title, task, *args, **kwargs):
+        """Queue task(job, *args, **kwargs); its return value becomes job.result"""
+        job = Job(title)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, task, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def _run(self, job, task, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            with collect_metrics() as stages:
+                job.stages = stages
+                job.result = task(job, *args, **kwargs)
+            job.status = DONE
+            job.stage = "Finished"
+        except JobCancelled:
+            job.status = CANCELLED
+            job.stage = "Cancelled"
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.status = FAILED
+            job.stage = "Failed"
+            logger.exception(f"❌ Job {job.id} failed: {job.error}")
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        """Cancel every job and stop the pool"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
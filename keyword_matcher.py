@@ -0,0 +1,131 @@
+import re
+
+_WORD_CHAR = re.compile(r'\w')
+
+class KeywordMatcher:
+    """
+    Compiled matcher that finds every keyword category in one pass over a sentence.
+
+    All keywords are folded into a single lookahead regex, so the lower-cased
+    text is scanned once instead of once per keyword. Results are the same as
+    testing each keyword in order: for every category, the first keyword in
+    its list that occurs in the text.
+    """
+
+    def __init__(self, keyword_categories, word_boundaries=False):
+        self.word_boundaries = word_boundaries
+        self.categories = list(keyword_categories.keys())
+
+        # lower-cased keyword -> [(category index, keyword index, original keyword)]
+        self._owners = {}
+        # An empty keyword is "in" every sentence, same as the original loop
+        self._always = []
+        for category_index, keywords in enumerate(keyword_categories.values()):
+            for keyword_index, keyword in enumerate(keywords):
+                entry = (category_index, keyword_index, keyword)
+                lowered = keyword.lower()
+                if lowered:
+                    self._owners.setdefault(lowered, []).append(entry)
+                else:
+                    self._always.append(entry)
+
+        # Each position reports its longest keyword. Shorter keywords that
+        # are prefixes of it start at the same position and are recovered
+        # from this table.
+        keywords = list(self._owners)
+        self._prefixes = {
+            keyword: [other for other in keywords if other != keyword and keyword.startswith(other)]
+            for keyword in keywords
+        }
+
+        self._pattern = None
+        if keywords:
+            alternation = _trie_pattern(keywords)
+            if word_boundaries:
+                # Keywords must not touch a word character on either side,
+                # so "agree" no longer matches inside "disagree"
+                self._pattern = re.compile(rf'(?<!\w)(?=({alternation})(?!\w))')
+            else:
+                self._pattern = re.compile(rf'(?=({alternation}))')
+
+    def _ends_word(self, text, end):
+        """Check the word boundary after a prefix keyword"""
+        return not self.word_boundaries or _WORD_CHAR.match(text, end) is None
+
+    def find_keywords(self, lowered_text):
+        """
+        Return the set of lower-cased keywords that occur in already lower-cased text
+        """
+        found = set()
+        if self._pattern is None:
+            return found
+
+        for match in self._pattern.finditer(lowered_text):
+            keyword = match.group(1)
+            found.add(keyword)
+            for prefix in self._prefixes[keyword]:
+                if prefix not in found and self._ends_word(lowered_text, match.start() + len(prefix)):
+                    found.add(prefix)
+
+        return found
+
+    def match(self, text):
+        """
+        Return [(category, keyword)] for every category that matches the text,
+        in category order, using the first matching keyword of each category
+        """
+        found = self.find_keywords(text.lower())
+
+        best = {}
+        entries = list(self._always)
+        for keyword in found:
+            entries.extend(self._owners[keyword])
+        for category_index, keyword_index, keyword in entries:
+            current = best.get(category_index)
+            if current is None or keyword_index < current[0]:
+                best[category_index] = (keyword_index, keyword)
+
+        return [(self.categories[index], best[index][1]) for index in sorted(best)]
+
+
+def _trie_pattern(keywords):
+    """
+    Build a regex alternation shaped like a prefix trie
+
+    A flat "a|b|c" alternation makes the regex engine try every keyword at
+    every position. Sharing prefixes means each position is rejected after
+    checking its first character against a handful of branches. Optional
+    suffixes are greedy, so the longest keyword is tried first.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+_MATCHER_CACHE = {}
+
+def get_matcher(keyword_categories, word_boundaries=False):
+    """
+    Build (or reuse) the compiled matcher for a keyword category mapping
+    """
+    key = (tuple((category, tuple(keywords)) for category, keywords in keyword_categories.items()), word_boundaries)
+    matcher = _MATCHER_CACHE.get(key)
+    if matcher is None:
+        matcher = KeywordMatcher(keyword_categories, word_boundaries)
+        _MATCHER_CACHE[key] = matcher
+    return matcher
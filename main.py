@@ -1,78 +1,97 @@
-from document_reader import read_document
-from extractor import extract_obligations
-from excel_mapper import map_to_framework
-from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+from pipeline import stream_obligations
+from observation_store import ObservationStore, store_path_for
+from cache import DiskCache, file_sha256
+from framework_index import default_index_cache
+from instrumentation import configure_logging
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, ORIGINAL_FRAMEWORK_PATH, WORKING_FRAMEWORK_PATH
 import os
 
 def main():
+    configure_logging()
     print("=== Privacy Document Automation Tool ===")
     print("This tool maps privacy obligations directly to your Excel framework.")
     
     # File paths
-    original_framework = "Data Protection Framework_PDPA_Malaysia.xlsx"
-    working_framework = "Working_Framework.xlsx"
+    original_framework = ORIGINAL_FRAMEWORK_PATH
+    working_framework = WORKING_FRAMEWORK_PATH
     
-    # Check if we have a working copy, otherwise start with original
-    if os.path.exists(working_framework):
-        current_framework = working_framework
-        print("📖 Continuing with existing working framework...")
-    else:
-        current_framework = original_framework
-        print("📖 Starting with original framework...")
+    # Documents seen before are served from the extraction cache; extracted
+    # clauses are appended to the working framework's observation store
+    cache = DiskCache()
+    store = ObservationStore(store_path_for(working_framework))
+    # The working framework's index is cached when it is saved, so the
+    # next export starts without parsing it
+    index_cache = default_index_cache()
     
+    # Keep processing documents until the user is done; each one is written
+    # to the working framework before the next, so nothing is lost on exit
+    try:
+        while process_document(store, original_framework, working_framework, cache, index_cache):
+            pass
+    finally:
+        store.close()
+    
+    if os.path.exists(working_framework):
+        print(f"🎉 Final updated framework saved as: {working_framework}")
+
+def process_document(store, original_framework, working_framework, cache=None, index_cache=None):
+    """
+    Process one document interactively: append its clauses to the store and
+    write them into the working framework.
+    Returns True if the user wants to process another document.
+    """
     # Get document path from user
     file_path = input("Enter the path to your privacy document: ").strip()
     
     try:
-        # 1. Read the document
-        print("Reading document...")
-        text = read_document(file_path)
-        print(f"Document read successfully! ({len(text)} characters)")
-        
-        # 2. Extract obligations with domain mapping
-        print("Extracting obligations and mapping to domains...")
-        obligations = extract_obligations(text, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN)
+        # Readers log and skip unreadable files, so check before printing the header
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"Document '{file_path}' not found")
+
+        # 1. Read the document and extract obligations page by page,
+        #    displaying each one as soon as it is found
+        print("Reading document and extracting obligations...")
+        print("\n--- EXTRACTED OBLIGATIONS ---")
+        obligations = []
+        for obligation in stream_obligations(file_path, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, cache=cache):
+            obligations.append(obligation)
+            print(f"{len(obligations)}. [{obligation['domain']}] {obligation['text']}")
         print(f"Found {len(obligations)} relevant clauses!")
         
-        # 3. Display what was found
         if obligations:
-            print("\n--- EXTRACTED OBLIGATIONS ---")
-            for i, obligation in enumerate(obligations, 1):
-                print(f"{i}. [{obligation['domain']}] {obligation['text']}")
+            # 2. Append to the observation store (only new clauses are added)
+            doc_hash = file_sha256(file_path)
+            new_clauses = store.add_document(file_path, doc_hash, obligations)
+            print(f"✅ Stored {new_clauses} new clauses ({len(obligations) - new_clauses} already stored).")
+            print(f"📊 Total documents processed: {store.count_documents()}")
             
-            # 4. Map to Excel framework (incrementally)
-            print(f"\nMapping to framework: {current_framework}")
-            
-            success = map_to_framework(obligations, current_framework, working_framework)
-            
-            if success:
-                print(f"✅ Success! Framework updated with new findings.")
-                print(f"📊 Total documents processed: {count_processed_documents(working_framework)}")
-                
-                # Ask if user wants to process another document
-                another = input("\nProcess another document? (y/n): ").lower()
-                if another == 'y':
-                    main()  # Restart the process
-                else:
-                    print(f"🎉 Final updated framework saved as: {working_framework}")
-            else:
-                print("❌ Failed to update the framework.")
+            # 3. Map this document's clauses to the Excel framework (incrementally)
+            export_framework(store, [doc_hash], original_framework, working_framework, index_cache)
         else:
             print("No relevant obligations found.")
             
     except Exception as e:
         print(f"Error: {e}")
+    
+    # Ask if user wants to process another document
+    another = input("\nProcess another document? (y/n): ").lower()
+    return another == 'y'
 
-def count_processed_documents(framework_path):
-    """Count how many documents have been processed"""
-    try:
-        import pandas as pd
-        df = pd.read_excel(framework_path, sheet_name='Data Protection Framework 1')
-        # Count rows with observations
-        return df['Observation'].notna().sum()
-    except:
-        return 0
+def export_framework(store, doc_hashes, original_framework, working_framework, index_cache=None):
+    """Write the stored clauses of these documents into the working framework"""
+    # Check if we have a working copy, otherwise start with original
+    if os.path.exists(working_framework):
+        current_framework = working_framework
+        print("📖 Continuing with existing working framework...")
+    else:
+        current_framework = original_framework
+        print("📖 Starting with original framework...")
+    
+    print(f"\nMapping {len(store.obligations(doc_hashes=doc_hashes))} stored clauses to framework: {current_framework}")
+    if store.export_framework(current_framework, working_framework, doc_hashes, index_cache=index_cache):
+        print("✅ Success! Framework updated with new findings.")
+    else:
+        print("❌ Failed to update the framework.")
 
 if __name__ == "__main__":
-    main()
-    
\ No newline at end of file
+    main()
\ No newline at end of file
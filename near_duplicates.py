@@ -0,0 +1,129 @@
+# near_duplicates.py
+"""
+Collapse near-identical clauses (boilerplate repeated across vendor DPAs).
+
+Each clause is cut into word shingles (runs of SHINGLE_WORDS words) and
+summarized by a MinHash signature. Clauses are only compared when their
+signatures agree on a whole LSH band, so grouping 100k clauses doesn't
+compare every pair. Candidates are confirmed with the exact Jaccard
+similarity of their shingles.
+
+Grouping is greedy in input order: a clause joins the first earlier
+representative it is similar enough to, or becomes a representative
+itself. The result is the same on every run.
+"""
+import re
+import zlib
+
+SHINGLE_WORDS = 3
+# 20 bands of 6 rows: pairs with a Jaccard similarity of 0.7 become
+# candidates with a probability of 92%, pairs at 0.4 with 8%
+NUM_PERMUTATIONS = 120
+BANDS = 20
+# Candidates whose first ESTIMATE_ROWS signature values agree on fewer
+# than threshold - ESTIMATE_SLACK of them are dropped before computing
+# the exact similarity
+ESTIMATE_ROWS = 32
+ESTIMATE_SLACK = 0.2
+# Clauses hashed per numpy batch (bounds the memory of the hash matrix)
+SIGNATURE_BATCH = 2048
+
+_WORD = re.compile(r'\w+')
+_permutations = None
+
+def shingles(text):
+    """Set of hashed word shingles of a text (case and punctuation ignored)"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))}
+    return {zlib.crc32(' '.join(words[i:i + SHINGLE_WORDS]).encode('utf-8'))
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def jaccard(first, second):
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+def collapse_near_duplicates(texts, threshold):
+    """
+    Group texts whose shingle sets have a Jaccard similarity of at least
+    threshold. Returns [(representative, similar_count)] in first-seen
+    order, where similar_count is the number of other texts in its group
+    (exact repeats included).
+    """
+    # Exact repeats are folded first, so only distinct texts are hashed
+    counts = {}
+    for text in texts:
+        counts[text] = counts.get(text, 0) + 1
+    unique = list(counts)
+    if len(unique) < 2:
+        return [(text, count - 1) for text, count in counts.items()]
+
+    import numpy as np
+    shingle_sets = [shingles(text) for text in unique]
+    signatures = _signatures(shingle_sets)
+    band_keys = _band_keys(signatures)
+    estimates = np.ascontiguousarray(signatures[:, :ESTIMATE_ROWS])
+    min_agreement = (threshold - ESTIMATE_SLACK) * ESTIMATE_ROWS
+
+    buckets = {}
+    group_sizes = {}
+    for index, shingle_set in enumerate(shingle_sets):
+        candidates = set()
+        for band, key in enumerate(band_keys[index]):
+            candidates.update(buckets.get((band, key), ()))
+
+        representative = None
+        if candidates:
+            # The share of equal signature values estimates the similarity
+            candidates = np.sort(np.fromiter(candidates, dtype=np.intp, count=len(candidates)))
+            agreement = (estimates[candidates] == estimates[index]).sum(axis=1)
+            for candidate in candidates[agreement >= min_agreement].tolist():
+                if jaccard(shingle_set, shingle_sets[candidate]) >= threshold:
+                    representative = candidate
+                    break
+        if representative is None:
+            group_sizes[index] = counts[unique[index]]
+            for band, key in enumerate(band_keys[index]):
+                buckets.setdefault((band, key), []).append(index)
+        else:
+            group_sizes[representative] += counts[unique[index]]
+
+    return [(unique[index], size - 1) for index, size in group_sizes.items()]
+
+def _get_permutations():
+    """Multiply-shift hash functions (odd 64-bit multipliers and offsets), fixed across runs"""
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+        rng = np.random.default_rng(20240601)
+        multipliers = rng.integers(0, 2 ** 63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        offsets = rng.integers(0, 2 ** 63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+        _permutations = (multipliers, offsets)
+    return _permutations
+
+def _signatures(shingle_sets):
+    """MinHash signatures, one row of NUM_PERMUTATIONS values per shingle set"""
+    import numpy as np
+    multipliers, offsets = _get_permutations()
+    # Hash values keep their top 32 bits, so they fit in uint32
+    signatures = np.empty((len(shingle_sets), NUM_PERMUTATIONS), dtype=np.uint32)
+
+    for start in range(0, len(shingle_sets), SIGNATURE_BATCH):
+        batch = shingle_sets[start:start + SIGNATURE_BATCH]
+        lengths = [len(shingle_set) for shingle_set in batch]
+        values = np.fromiter((value for shingle_set in batch for value in shingle_set),
+                             dtype=np.uint64, count=sum(lengths))
+        # Each shingle through every hash function (uint64 arithmetic wraps)
+        hashed = (values[:, None] * multipliers + offsets) >> np.uint64(32)
+        # Minimum over each set's run of rows
+        boundaries = np.cumsum([0] + lengths[:-1])
+        signatures[start:start + len(batch)] = np.minimum.reduceat(hashed, boundaries, axis=0)
+    return signatures
+
+def _band_keys(signatures):
+    """One hashed key per LSH band for each signature, as lists of ints"""
+    import numpy as np
+    rows = NUM_PERMUTATIONS // BANDS
+    bands = signatures.reshape(len(signatures), BANDS, rows)
+    mixers = _get_permutations()[0][:rows]
+    return (bands.astype(np.uint64) * mixers).sum(axis=2, dtype=np.uint64).tolist()
@@ -0,0 +1,144 @@
+# observation_store.py
+import os
+import sqlite3
+from datetime import datetime
+
+from config import OBSERVATION_STORE_SUFFIX
+from excel_mapper import map_to_framework
+
+def store_path_for(output_path):
+    """Path of the observation store kept next to an output workbook"""
+    return os.path.splitext(output_path)[0] + OBSERVATION_STORE_SUFFIX
+
+class ObservationStore:
+    """
+    Append-only SQLite store of extracted obligations with document provenance.
+
+    Adding a document only inserts its new clauses; the Excel framework is
+    generated from the store when export_framework is called. A store
+    belongs to one output workbook (see store_path_for).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_hash TEXT PRIMARY KEY,
+                source_file TEXT NOT NULL,
+                clauses INTEGER NOT NULL,
+                added_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS obligations (
+                id INTEGER PRIMARY KEY,
+                doc_hash TEXT NOT NULL,
+                source_file TEXT NOT NULL,
+                page INTEGER,
+                start_offset INTEGER,
+                end_offset INTEGER,
+                category TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                matched_keyword TEXT NOT NULL,
+                text TEXT NOT NULL,
+                added_at TEXT NOT NULL,
+                UNIQUE (doc_hash, category, text)
+            );
+            CREATE INDEX IF NOT EXISTS obligations_domain ON obligations (domain);
+        """)
+        # Stores created before clause spans were kept get the span columns
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(obligations)")}
+        for column in ('start_offset', 'end_offset'):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE obligations ADD COLUMN {column} INTEGER")
+        self._conn.commit()
+
+    def add_document(self, source_file, doc_hash, obligations):
+        """
+        Append a document's obligations, with their page and character span.
+        Clauses already stored for the same document are ignored. Returns the
+        number of new clauses.
+        """
+        added_at = datetime.now().isoformat(timespec='seconds')
+        rows = [
+            (doc_hash, source_file, obs.get('page'), obs.get('start'), obs.get('end'), obs['category'],
+             obs['domain'], obs['matched_keyword'], obs['text'], added_at)
+            for obs in obligations
+        ]
+
+        with self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO obligations"
+                " (doc_hash, source_file, page, start_offset, end_offset, category, domain, matched_keyword,"
+                " text, added_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            new_clauses = self._conn.total_changes - before
+            self._conn.execute(
+                "INSERT OR IGNORE INTO documents (doc_hash, source_file, clauses, added_at) VALUES (?, ?, ?, ?)",
+                (doc_hash, source_file, len(obligations), added_at)
+            )
+        return new_clauses
+
+    def count_documents(self):
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def count_obligations(self):
+        return self._conn.execute("SELECT COUNT(*) FROM obligations").fetchone()[0]
+
+    def obligations(self, domain=None, doc_hashes=None):
+        """
+        Stored obligations in the order they were added, optionally only
+        those of one domain and/or of the documents with these hashes
+        """
+        query = ("SELECT text, category, matched_keyword, domain, source_file, doc_hash, page,"
+                 " start_offset, end_offset FROM obligations")
+        conditions = []
+        params = []
+        if domain is not None:
+            conditions.append("domain = ?")
+            params.append(domain)
+        if doc_hashes is not None:
+            doc_hashes = list(dict.fromkeys(doc_hashes))
+            conditions.append(f"doc_hash IN ({', '.join('?' * len(doc_hashes))})")
+            params.extend(doc_hashes)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+
+        return [
+            {
+                'text': text,
+                'category': category,
+                'matched_keyword': matched_keyword,
+                'domain': domain,
+                'source_file': source_file,
+                'doc_hash': doc_hash,
+                'page': page,
+                'start': start,
+                'end': end
+            }
+            for text, category, matched_keyword, domain, source_file, doc_hash, page, start, end
+            in self._conn.execute(query, params)
+        ]
+
+    def export_framework(self, framework_path, output_path, doc_hashes, match_controls=False, index_cache=None):
+        """
+        Write the stored clauses of the documents with these hashes into the
+        Excel framework. Existing observations are merged with the clauses,
+        so exporting again onto the same workbook does not duplicate bullets,
+        and documents not asked for never reach a fresh framework.
+        match_controls maps clauses to individual rows and index_cache keeps
+        parsed workbooks (see map_to_framework).
+        """
+        return map_to_framework(self.obligations(doc_hashes=doc_hashes), framework_path, output_path, merge=True,
+                                match_controls=match_controls, index_cache=index_cache)
+
+    def close(self):
+        self._conn.close()
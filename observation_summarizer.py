@@ -1,30 +1,33 @@
 # observation_summarizer.py
-import pandas as pd
-from comprehensive_summarizer import ComprehensiveObservationSummarizer  # The code I provided earlier
+from comprehensive_summarizer import ComprehensiveObservationSummarizer, default_summary_cache  # The code I provided earlier
+from excel_mapper import update_framework_column, read_framework_sheet
+from instrumentation import configure_logging
 
-def summarize_observations(input_file, output_file):
+def summarize_observations(input_file, output_file, batch_size=256, n_process=1, use_cache=True):
     """
     Process your Excel/CSV file to add concise observations
     """
-    # Read your data
-    df = pd.read_excel(input_file)  # or pd.read_csv(input_file)
+    # Read your data (the framework sheet, which is also the one written below)
+    df = read_framework_sheet(input_file)
     
-    # Initialize summarizer
-    summarizer = ComprehensiveObservationSummarizer()
+    # Initialize summarizer (unchanged rows are served from the summary cache)
+    summarizer = ComprehensiveObservationSummarizer(cache=default_summary_cache() if use_cache else None)
     
-    # Add concise observations
-    df['Concise_Observation'] = df.apply(
-        lambda row: summarizer.generate_concise_observation(
-            row['Observation'], 
-            row['Keywords']
-        ), 
-        axis=1
+    # Add concise observations (rows needing spaCy are parsed in batches)
+    df['Concise_Observation'] = summarizer.generate_concise_observations(
+        df['Observation'],
+        df['Keywords'],
+        batch_size=batch_size,
+        n_process=n_process
     )
     
-    # Save results
-    df.to_excel(output_file, index=False)
+    # Save results (other sheets and formatting are kept)
+    update_framework_column(input_file, 'Concise_Observation', df['Concise_Observation'].tolist(), output_file)
     print(f"Processing complete! Output saved to {output_file}")
+    if use_cache:
+        print(f"Summary cache: {summarizer.cache.stats()}")
 
 # Run it
 if __name__ == "__main__":
+    configure_logging()
     summarize_observations('your_input_file.xlsx', 'output_with_summaries.xlsx')
\ No newline at end of file
@@ -0,0 +1,140 @@
+from document_reader import iter_pages, resolve_backend
+from extractor import Obligation, iter_sentence_spans, iter_obligations
+from cache import file_sha256, rules_fingerprint
+from instrumentation import timed_iter
+from config import CACHE_MAX_BYTES
+
+def stream_obligations(file_path, keyword_categories, category_to_domain, word_boundaries=False,
+                       cache=None, on_progress=None, parallel_match=False, **reader_options):
+    """
+    Read, split and extract a document as one lazy pipeline.
+
+    Pages are parsed only as obligations are consumed, so the first results
+    are available before the last page is read and memory does not grow with
+    the document size. reader_options are passed to iter_pages
+    (e.g. backend='fast', or parallel=True for page-parallel PDF extraction). Each obligation
+    keeps its PDF page and its character span in the document text.
+
+    With a DiskCache, documents seen before are served from the cache. The
+    obligations key includes a fingerprint of the rules, so editing
+    KEYWORD_CATEGORIES or CATEGORY_TO_DOMAIN re-extracts automatically
+    (re-using the cached text).
+
+    on_progress, if given, is called with 'chunks' for each piece of text read
+    (a PDF page, a Word paragraph, a TXT block) and with 'sentences' for each
+    sentence scanned. An exception it raises stops the stream.
+
+    With parallel_match=True, keyword matching of a large document is spread
+    over a process pool (see extractor.iter_obligations); the obligations are
+    the same, in the same order.
+
+    The read, split and match stages are timed separately (see instrumentation);
+    the read stage is labelled with the text-extraction backend.
+    """
+    backend = resolve_backend(file_path, reader_options.get('backend')).name
+    if cache is not None:
+        return _stream_cached_obligations(file_path, backend, keyword_categories, category_to_domain,
+                                          word_boundaries, cache, on_progress, parallel_match, reader_options)
+    
+    chunks = iter_pages(file_path, **reader_options)
+    return _timed_stages(chunks, backend, keyword_categories, category_to_domain, word_boundaries, on_progress,
+                         parallel_match)
+
+def _pages_key(document_hash, backend):
+    # (page, text) pieces, so cached documents keep their page numbers;
+    # backends extract different text, so each has its own entry
+    return f"pages:{document_hash}:{backend}"
+
+def _obligations_key(document_hash, backend, keyword_categories, category_to_domain, word_boundaries):
+    fingerprint = rules_fingerprint(keyword_categories, category_to_domain)
+    return f"obligations:{document_hash}:{backend}:{fingerprint}:{int(word_boundaries)}"
+
+def _stream_cached_obligations(file_path, backend, keyword_categories, category_to_domain, word_boundaries,
+                               cache, on_progress, parallel_match, reader_options):
+    # Hash eagerly so a missing file fails at the call, like iter_document
+    document_hash = file_sha256(file_path)
+    return _iter_cached_obligations(file_path, document_hash, backend, keyword_categories, category_to_domain,
+                                    word_boundaries, cache, on_progress, parallel_match, reader_options)
+
+def _iter_cached_obligations(file_path, document_hash, backend, keyword_categories, category_to_domain,
+                             word_boundaries, cache, on_progress, parallel_match, reader_options):
+    key = _obligations_key(document_hash, backend, keyword_categories, category_to_domain, word_boundaries)
+    cached = cache.get(key)
+    if cached is not None:
+        for values in cached:
+            yield Obligation.from_dict(values)
+        return
+    
+    skipped_pages = reader_options.get('skipped_pages')
+    skipped_before = len(skipped_pages) if skipped_pages is not None else 0
+    
+    # Entries larger than the cache can hold are not kept in memory either
+    limit = getattr(cache, 'max_bytes', CACHE_MAX_BYTES)
+    pages = cache.get(_pages_key(document_hash, backend))
+    if pages is not None:
+        chunks = [tuple(page) for page in pages]
+    else:
+        # Keep the chunks while streaming so the text can be cached afterwards
+        pieces = _Recorder(limit, lambda piece: len(piece[1]) + _PIECE_OVERHEAD)
+        chunks = pieces.recorded(iter_pages(file_path, **reader_options))
+    
+    obligations = _Recorder(limit, lambda obligation: len(obligation.text) + _OBLIGATION_OVERHEAD)
+    yield from obligations.recorded(_timed_stages(chunks, backend, keyword_categories, category_to_domain,
+                                                  word_boundaries, on_progress, parallel_match))
+    
+    # Don't cache an incomplete read (pages skipped by the parallel PDF reader)
+    if skipped_pages is not None and len(skipped_pages) > skipped_before:
+        return
+    if pages is None and not pieces.overflowed:
+        cache.put(_pages_key(document_hash, backend), [list(piece) for piece in pieces.items])
+    if not obligations.overflowed:
+        cache.put(key, [obligation.to_dict() for obligation in obligations.items])
+
+# Lower bounds of the JSON size of a cached (page, text) piece and obligation
+# beyond their text, used to stop recording an entry too large to cache
+_PIECE_OVERHEAD = 8
+_OBLIGATION_OVERHEAD = 100
+
+class _Recorder:
+    """
+    Keeps the items of a stream for caching, until their estimated size
+    passes limit; then they are dropped and the rest is not kept, so memory
+    stays flat for documents too large to cache
+    """
+
+    def __init__(self, limit, size_of):
+        self.items = []
+        self.overflowed = False
+        self._limit = limit
+        self._size_of = size_of
+        self._size = 0
+
+    def recorded(self, items):
+        for item in items:
+            if not self.overflowed:
+                self._size += self._size_of(item)
+                if self._size > self._limit:
+                    self.overflowed = True
+                    self.items = []
+                else:
+                    self.items.append(item)
+            yield item
+
+def _timed_stages(chunks, backend, keyword_categories, category_to_domain, word_boundaries, on_progress,
+                  parallel_match=False):
+    chunks = timed_iter('read', chunks, 'chunks', backend=backend)
+    sentences = timed_iter('split', iter_sentence_spans(_counted(chunks, on_progress, 'chunks')),
+                           'sentences', inner=chunks)
+    obligations = iter_obligations(_counted(sentences, on_progress, 'sentences'),
+                                   keyword_categories, category_to_domain, word_boundaries, parallel_match)
+    return timed_iter('match', obligations, 'clauses', inner=sentences)
+
+def _counted(items, on_progress, stage):
+    if on_progress is None:
+        return items
+    return _report_each(items, on_progress, stage)
+
+def _report_each(items, on_progress, stage):
+    for item in items:
+        on_progress(stage)
+        yield item
@@ -0,0 +1,30 @@
+# test_assessment.py
+from io import BytesIO
+
+from assessment import run_assessment
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+from excel_mapper import FRAMEWORK_SHEET
+from jobs import Job
+
+def framework_bytes():
+    from openpyxl import Workbook
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = FRAMEWORK_SHEET
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    for row, domain in enumerate(sorted(set(CATEGORY_TO_DOMAIN.values())), 1):
+        worksheet.append([f"C-{row}", domain, None, None])
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def test_assessment_without_a_workspace_uses_a_temporary_one():
+    with open('test_document.txt', 'rb') as file:
+        documents = [('policy.txt', file.read())]
+
+    job = Job('assessment')
+    result = run_assessment(job, documents, framework_bytes(), KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN,
+                            cache_path=None)
+    assert not job.warnings
+    assert result['obligations'] and result['mapped_bytes']
+    assert job.snapshot()['progress']['clauses'] == len(result['obligations'])
@@ -0,0 +1,52 @@
+# test_batch.py
+import json
+import shutil
+
+from batch import main
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, NEAR_DUPLICATE_THRESHOLD
+from excel_mapper import group_observations_by_domain, read_framework_sheet, FRAMEWORK_SHEET
+from pipeline import stream_obligations
+
+def write_framework(path):
+    """Framework workbook with a cover page before the framework sheet"""
+    from openpyxl import Workbook
+    workbook = Workbook()
+    cover = workbook.active
+    cover.title = 'Cover'
+    cover['A1'] = 'Client assessment'
+    worksheet = workbook.create_sheet(FRAMEWORK_SHEET)
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    for row, domain in enumerate(sorted(set(CATEGORY_TO_DOMAIN.values())), 1):
+        worksheet.append([f"C-{row}", domain, None, None])
+    workbook.save(path)
+
+def test_batch_run_maps_every_document_into_the_framework(tmp_path):
+    from openpyxl import load_workbook
+    documents = tmp_path / 'documents'
+    documents.mkdir()
+    for name in ('test_document.txt', 'test_document_2.txt'):
+        shutil.copy(name, documents / name)
+    framework = str(tmp_path / 'framework.xlsx')
+    output = str(tmp_path / 'working.xlsx')
+    summary_path = str(tmp_path / 'summary.json')
+    write_framework(framework)
+
+    assert main([str(documents), '--framework', framework, '--output', output, '--summary', summary_path,
+                 '--workers', '1', '--no-cache', '--no-store']) == 0
+
+    with open(summary_path, encoding='utf-8') as file:
+        summary = json.load(file)
+    assert summary['mapped'] and summary['total_documents'] == 2 and summary['failed_documents'] == 0
+
+    # Both documents' clauses are mapped together, in file order
+    obligations = [obligation for name in ('test_document.txt', 'test_document_2.txt')
+                   for obligation in stream_obligations(str(documents / name), KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN)]
+    assert len(obligations) == summary['total_clauses'] > 0
+    expected, _ = group_observations_by_domain(obligations, NEAR_DUPLICATE_THRESHOLD)
+    frame = read_framework_sheet(output)
+    assert dict(zip(frame['Domain'], frame['Observation'].fillna(''))) == {
+        domain: expected.get(domain, '') for domain in frame['Domain']}
+
+    workbook = load_workbook(output)
+    assert workbook.sheetnames == ['Cover', FRAMEWORK_SHEET]
+    assert workbook['Cover']['A1'].value == 'Client assessment'
@@ -0,0 +1,8 @@
+# test_benchmarks.py
+from benchmarks.run_benchmarks import main
+
+def test_missing_baseline_fails_the_gate(tmp_path, capsys):
+    baseline = str(tmp_path / 'baseline.json')
+    assert main(['--baseline', baseline, '--output', str(tmp_path / 'results.json')]) == 1
+    assert "No baseline" in capsys.readouterr().out
+    assert not (tmp_path / 'results.json').exists()
@@ -0,0 +1,41 @@
+# test_control_matcher.py
+from io import BytesIO
+
+from control_matcher import ControlMatcher
+from excel_mapper import map_to_framework, FRAMEWORK_SHEET
+
+CONTROLS = ['encryption at rest', 'access control review', None, 'breach notification within 72 hours']
+
+def test_clauses_go_to_their_most_similar_controls():
+    clauses = ['Data is protected by encryption at rest.', 'Notify the customer of a breach.',
+               'Nothing relevant here.', 'Access review and breach notification are required.']
+    texts, rows, scores = ControlMatcher(CONTROLS).match(clauses, top_k=1, threshold=0.1)
+    assert texts.tolist() == [0, 1, 3]
+    assert rows.tolist() == [0, 3, 3]
+    assert scores[0] > 0.99
+
+    # Each clause keeps its rows best first, at most top_k of them
+    texts, rows, scores = ControlMatcher(CONTROLS).match(clauses[3:], top_k=2, threshold=0.1)
+    assert rows.tolist() == [3, 1] and scores[0] >= scores[1]
+
+def test_map_to_framework_writes_matched_controls_only():
+    from openpyxl import Workbook, load_workbook
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = FRAMEWORK_SHEET
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    for ref, keywords in zip(['C-1', 'C-2', 'C-3', 'C-4'], CONTROLS):
+        worksheet.append([ref, 'Security', keywords, None])
+    framework = BytesIO()
+    workbook.save(framework)
+
+    obligations = [{'text': 'Backups use encryption at rest.', 'domain': 'Security'},
+                   {'text': 'A breach notification is sent within 72 hours.', 'domain': 'Security'}]
+    for in_place in (True, False):
+        output = BytesIO()
+        assert map_to_framework(obligations, BytesIO(framework.getvalue()), output, in_place=in_place,
+                                match_controls=True)
+        sheet = load_workbook(BytesIO(output.getvalue()))[FRAMEWORK_SHEET]
+        observations = [row[3] for row in sheet.iter_rows(min_row=2, values_only=True)]
+        assert observations == ['• Backups use encryption at rest.', None, None,
+                                '• A breach notification is sent within 72 hours.']
@@ -0,0 +1,97 @@
+# test_document_reader.py
+from docx import Document
+
+from document_reader import iter_pages, read_document
+
+def test_docx_reader_covers_headers_tables_and_footers(tmp_path):
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Schedule 1: Data Processing Terms"
+    doc.sections[0].footer.paragraphs[0].text = "Confidential"
+    doc.add_paragraph("The processor shall protect personal data.")
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "Retention"
+    table.cell(0, 1).text = "Records must be deleted after 7 years."
+    paragraph = doc.add_paragraph("Name")
+    paragraph.add_run().add_tab()
+    paragraph.add_run("Signature")
+    path = str(tmp_path / 'contract.docx')
+    doc.save(path)
+
+    assert read_document(path) == (
+        "Schedule 1: Data Processing Terms\n"
+        "The processor shall protect personal data.\n"
+        "Retention\n"
+        "Records must be deleted after 7 years.\n"
+        "Name\tSignature\n"
+        "Confidential\n"
+    )
+    assert all(page is None for page, _ in iter_pages(path))
+
+def test_fast_pdf_backend_reads_the_layout_text(tmp_path):
+    from benchmarks.corpus import make_pages, write_pdf
+    path = str(tmp_path / 'policy.pdf')
+    write_pdf(path, make_pages(3))
+
+    layout = list(iter_pages(path, backend='layout'))
+    assert [page for page, _ in layout] == [1, 2, 3]
+    assert list(iter_pages(path, backend='fast')) == layout
+    assert read_document(path, backend={'.pdf': 'fast'}) == "".join(text for _, text in layout)
+
+def test_obligation_spans_read_back_from_every_format(tmp_path):
+    from benchmarks.corpus import write_document
+    from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+    from document_reader import read_span
+    from extractor import extract_obligations
+    for file_format in ('txt', 'docx', 'pdf'):
+        path = write_document(str(tmp_path), file_format, 3)
+        backend = 'fast' if file_format == 'pdf' else None
+        obligations = extract_obligations(read_document(path, backend=backend), KEYWORD_CATEGORIES,
+                                          CATEGORY_TO_DOMAIN)
+        assert obligations
+        # Spans from early, middle and late pages
+        for obligation in obligations[::max(1, len(obligations) // 6)]:
+            span_text = read_span(path, obligation['start'], obligation['end'], backend=backend)
+            assert ' '.join(span_text.split()) == obligation['text']
+
+def test_backend_must_read_the_file_type():
+    import pytest
+    from document_reader import resolve_backend
+    assert resolve_backend('notes.TXT').name == 'txt'
+    with pytest.raises(ValueError):
+        resolve_backend('notes.txt', 'fast')
+    with pytest.raises(ValueError):
+        resolve_backend('policy.pdf', 'ocr')
+    with pytest.raises(ValueError):
+        resolve_backend('slides.pptx')
+
+class SlowPagePDF:
+    """Stand-in PDF of 12 pages whose page 10 never finishes extracting"""
+    page_count = 12
+
+    def __init__(self, file_path):
+        pass
+
+    def extract(self, index):
+        if index == 9:
+            import time
+            time.sleep(60)
+        return f"Page {index + 1}"
+
+    def close(self):
+        pass
+
+def test_parallel_pdf_pages_come_back_in_document_order(tmp_path):
+    from benchmarks.corpus import make_pages, write_pdf
+    path = str(tmp_path / 'policy.pdf')
+    # Three ranges of PDF_PAGES_PER_TASK pages over two workers
+    write_pdf(path, make_pages(17))
+    serial = list(iter_pages(path, backend='fast'))
+    assert [page for page, _ in serial] == list(range(1, 18))
+    assert list(iter_pages(path, backend='fast', parallel=True, max_workers=2)) == serial
+
+def test_parallel_pdf_skips_and_reports_a_hung_page():
+    from document_reader import _iter_pdf_parallel
+    skipped_pages = []
+    pages = list(_iter_pdf_parallel('hung.pdf', SlowPagePDF, 2, 0.5, skipped_pages))
+    assert pages == [(number, f"Page {number}\n") for number in range(1, 13) if number != 10]
+    assert skipped_pages == [(10, "timed out after 0.5s")]
@@ -0,0 +1,86 @@
+# test_excel_mapper.py
+from io import BytesIO
+
+from excel_mapper import map_to_framework, read_framework_sheet, FRAMEWORK_SHEET
+
+OBLIGATIONS = [{'text': 'Personal data is encrypted at rest.', 'domain': 'Security'},
+               {'text': 'Consent is recorded before processing.', 'domain': 'Consent'}]
+
+def framework_with_cover():
+    """Framework workbook whose first sheet is a cover page"""
+    from openpyxl import Workbook
+    workbook = Workbook()
+    cover = workbook.active
+    cover.title = 'Cover'
+    cover['A1'] = 'Client assessment'
+    worksheet = workbook.create_sheet(FRAMEWORK_SHEET)
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    worksheet.append(['C-1', 'Security', 'encryption', None])
+    worksheet.append(['C-2', 'Consent', 'consent', None])
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def test_framework_sheet_is_read_after_a_cover_sheet():
+    output = BytesIO()
+    assert map_to_framework(OBLIGATIONS, BytesIO(framework_with_cover()), output)
+    frame = read_framework_sheet(BytesIO(output.getvalue()))
+    assert frame['Observation'].tolist() == ['• Personal data is encrypted at rest.',
+                                             '• Consent is recorded before processing.']
+
+GROUPED_OBLIGATIONS = OBLIGATIONS + [{'text': 'Personal data is encrypted at rest.', 'domain': 'Security'},
+                                     {'text': 'Access to systems requires two factors.', 'domain': 'Security'}]
+
+def framework_rows(existing_note):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = FRAMEWORK_SHEET
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    worksheet.append(['C-1', 'Security', None, None])
+    worksheet.append(['C-2', None, None, None])
+    worksheet.append(['C-3', 'Consent', None, existing_note])
+    worksheet.append(['C-4', 'Security', None, None])
+    worksheet.append(['C-5', 'Retention', None, None])
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def test_each_domain_is_formatted_once_and_written_to_its_empty_rows():
+    security = '• Personal data is encrypted at rest.\n• Access to systems requires two factors.'
+    for existing_note, consent in (('• Existing note', '• Existing note'),
+                                   # An all-empty Observation column is read as numbers; text still fits
+                                   (None, '• Consent is recorded before processing.')):
+        for in_place in (True, False):
+            output = BytesIO()
+            assert map_to_framework(GROUPED_OBLIGATIONS, BytesIO(framework_rows(existing_note)), output,
+                                    in_place=in_place)
+            frame = read_framework_sheet(BytesIO(output.getvalue()))
+            assert frame['Observation'].fillna('').tolist() == [security, '', consent, security, '']
+
+def test_in_place_mapping_keeps_the_workbook_and_is_idempotent():
+    from openpyxl import load_workbook
+    from openpyxl.styles import Font, PatternFill
+    workbook = load_workbook(BytesIO(framework_with_cover()))
+    worksheet = workbook[FRAMEWORK_SHEET]
+    worksheet['A1'].font = Font(bold=True)
+    worksheet['B2'].fill = PatternFill('solid', start_color='FFFF00')
+    worksheet.column_dimensions['D'].width = 60
+    framework = BytesIO()
+    workbook.save(framework)
+
+    first = BytesIO()
+    assert map_to_framework(OBLIGATIONS, BytesIO(framework.getvalue()), first, merge=True)
+    second = BytesIO()
+    assert map_to_framework(OBLIGATIONS, BytesIO(first.getvalue()), second, merge=True)
+    # Nothing left to change: the workbook is copied byte for byte
+    assert second.getvalue() == first.getvalue()
+
+    mapped = load_workbook(BytesIO(first.getvalue()))
+    assert mapped.sheetnames == ['Cover', FRAMEWORK_SHEET]
+    assert mapped['Cover']['A1'].value == 'Client assessment'
+    worksheet = mapped[FRAMEWORK_SHEET]
+    assert worksheet['A1'].font.bold
+    assert worksheet['B2'].fill.start_color.rgb.endswith('FFFF00')
+    assert worksheet.column_dimensions['D'].width == 60
+    assert worksheet['D2'].value == '• Personal data is encrypted at rest.'
@@ -0,0 +1,156 @@
+# test_extractor.py
+import random
+
+import pytest
+
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+from document_reader import read_document
+from extractor import split_into_sentences, iter_sentences, extract_obligations
+from pipeline import stream_obligations
+
+def random_chunks(text, rng):
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+def test_streamed_sentences_match_whole_text_split():
+    rng = random.Random(7)
+    text = read_document('test_document_2.txt') + "\nEnds here!  Then  more text?\n\nDone.   "
+    expected = split_into_sentences(text)
+    for _ in range(20):
+        assert list(iter_sentences(random_chunks(text, rng))) == expected
+
+def test_stream_obligations_matches_extract_obligations():
+    for path in ['test_document.txt', 'test_document_2.txt']:
+        expected = extract_obligations(read_document(path), KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN)
+        assert list(stream_obligations(path, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN)) == expected
+
+def test_cached_stream_obligations(tmp_path):
+    from cache import DiskCache
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'))
+    expected = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+    
+    first = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, cache=cache))
+    second = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, cache=cache))
+    assert first == second == expected
+    assert cache.stats()['hits'] == 1
+    
+    # Changing the rules invalidates the obligations but re-uses the cached text
+    rules = dict(KEYWORD_CATEGORIES, access_control=['encryption'])
+    changed = list(stream_obligations('test_document_2.txt', rules, CATEGORY_TO_DOMAIN, cache=cache))
+    assert any(obligation['matched_keyword'] == 'encryption' for obligation in changed)
+    assert cache.stats()['hits'] == 2
+
+def test_obligation_reads_like_a_dict():
+    from extractor import Obligation
+    values = {'text': 'Personal data is encrypted at rest.', 'category': 'security', 'matched_keyword': 'encrypt',
+              'domain': 'Security', 'page': 2, 'start': 10, 'end': 45}
+    obligation = Obligation.from_dict(values)
+    assert not hasattr(obligation, '__dict__')
+    assert obligation == values and obligation.to_dict() == values
+    assert obligation == Obligation.from_dict(dict(values)) and hash(obligation) == hash(Obligation.from_dict(values))
+    assert obligation != dict(values, page=3)
+    assert obligation.keys() == list(values) and dict(obligation) == values
+    assert obligation['domain'] == 'Security' and obligation.get('page') == 2
+    assert obligation.get('missing', 'default') == 'default' and 'start' in obligation
+    with pytest.raises(KeyError):
+        obligation['missing']
+
+def test_cached_obligations_share_interned_strings(tmp_path):
+    from cache import DiskCache
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'))
+    list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, cache=cache))
+    # Served from the cache: the values come back from JSON as new strings
+    cached = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, cache=cache))
+    assert cache.stats()['hits'] == 1
+    fresh = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+    for from_cache, extracted in zip(cached, fresh):
+        for field in ('category', 'matched_keyword', 'domain'):
+            assert from_cache[field] is extracted[field]
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    from cache import DiskCache
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), max_bytes=25)
+    cache.put('a', 'x' * 8)
+    cache.put('b', 'y' * 8)
+    assert cache.get('a') == 'x' * 8
+    cache.put('c', 'z' * 8)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+def test_streamed_stages_are_timed_separately():
+    from instrumentation import collect_metrics
+    with collect_metrics() as stages:
+        obligations = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+    by_stage = {stage['stage']: stage for stage in stages}
+    assert set(by_stage) == {'read', 'split', 'match'}
+    assert by_stage['split']['sentences'] == len(split_into_sentences(read_document('test_document_2.txt')))
+    assert by_stage['match']['clauses'] == len(obligations)
+
+def test_sentence_spans_point_into_the_source():
+    from extractor import iter_sentence_spans
+    rng = random.Random(3)
+    text = read_document('test_document.txt') + "  Spaced   out\tsentence here.\n\nTail  text without end"
+    pages = [(page, chunk) for page, chunk in enumerate(random_chunks(text, rng), 1)]
+    for sentence in iter_sentence_spans(pages):
+        assert ' '.join(text[sentence.start:sentence.end].split()) == sentence.text
+        page_start = sum(len(chunk) for _, chunk in pages[:sentence.page - 1])
+        assert page_start <= sentence.start < page_start + len(pages[sentence.page - 1][1])
+
+def test_long_text_without_boundaries_is_split_in_linear_time():
+    import time
+    from extractor import iter_sentence_spans
+    # 2 MB of table-like text with no sentence boundary, streamed in small chunks;
+    # re-copying the carry for every chunk would take minutes
+    chunks = ["cell 1234 " for _ in range(200000)] + ["End. Next sentence here."]
+    started = time.perf_counter()
+    sentences = list(iter_sentence_spans(chunks))
+    assert time.perf_counter() - started < 10
+    text = ''.join(chunks)
+    assert [(sentence.start, sentence.end) for sentence in sentences] == [(0, len(text) - 20), (len(text) - 19, len(text))]
+
+def test_parallel_matching_matches_serial_order():
+    from extractor import iter_sentence_spans, iter_obligations
+    sentences = list(iter_sentence_spans([read_document('test_document_2.txt')]))
+    serial = list(iter_obligations(sentences, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+    parallel = list(iter_obligations(sentences, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN, parallel=True,
+                                     max_workers=2, min_bytes=100, chunk_bytes=300))
+    assert parallel == serial
+
+def test_parallel_match_through_stream_obligations(monkeypatch):
+    import os
+    import extractor
+    started = []
+    parallel = extractor._iter_obligations_parallel
+    
+    def spy(*args):
+        started.append(args)
+        return parallel(*args)
+    
+    # Small thresholds and two workers, so this document takes the pool path
+    monkeypatch.setattr(extractor, '_iter_obligations_parallel', spy)
+    monkeypatch.setattr(extractor, 'PARALLEL_MATCH_MIN_BYTES', 100)
+    monkeypatch.setattr(extractor, 'MATCH_CHUNK_BYTES', 300)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    serial = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+    parallel_run = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN,
+                                           parallel_match=True))
+    assert started and parallel_run == serial
+
+def test_documents_larger_than_the_cache_are_streamed_uncached(tmp_path):
+    from cache import DiskCache
+    from pipeline import _Recorder
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), max_bytes=500)
+    expected = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+    assert list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN,
+                                   cache=cache)) == expected
+    assert cache.stats()['entries'] == 0
+    
+    # Recording stops, and what was kept is dropped, once the limit is passed
+    recorder = _Recorder(10, len)
+    assert list(recorder.recorded(['abcd', 'efgh', 'ijkl', 'mn'])) == ['abcd', 'efgh', 'ijkl', 'mn']
+    assert recorder.overflowed and recorder.items == []
@@ -0,0 +1,71 @@
+# test_framework_index.py
+from io import BytesIO
+
+from cache import DiskCache
+from excel_mapper import map_to_framework, FRAMEWORK_SHEET
+from framework_index import build_index, load_index
+from instrumentation import collect_metrics
+
+OBLIGATIONS = [{'text': 'Personal data is encrypted at rest.', 'domain': 'Security'},
+               {'text': 'Consent is recorded before processing.', 'domain': 'Consent'}]
+
+def framework_bytes():
+    from openpyxl import Workbook
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = FRAMEWORK_SHEET
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    worksheet.append(['C-1', 'Security', '  Encryption AT Rest ', None])
+    worksheet.append(['C-2', None, None, None])
+    worksheet.append(['C-3', 'Consent', 'consent', '• Existing note'])
+    worksheet.append(['C-4', 'Security', 'access', None])
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def test_index_groups_rows_and_normalizes_keywords():
+    index = build_index(BytesIO(framework_bytes()))
+    assert index['rows_by_domain'] == {'Security': [0, 3], 'Consent': [2]}
+    assert index['keywords'] == ['encryption at rest', None, 'consent', 'access']
+    assert index['observations'] == [None, None, '• Existing note', None]
+    assert index['columns']['Observation'] == 4
+
+def test_cached_index_skips_parsing_the_workbook(tmp_path):
+    cache = DiskCache(str(tmp_path / 'frameworks.sqlite'))
+    expected = BytesIO()
+    assert map_to_framework(OBLIGATIONS, BytesIO(framework_bytes()), expected, merge=True)
+
+    outputs = []
+    for _ in range(2):
+        output = BytesIO()
+        with collect_metrics() as stages:
+            assert map_to_framework(OBLIGATIONS, BytesIO(framework_bytes()), output, merge=True, index_cache=cache)
+        outputs.append(output)
+        parsed = [stage for stage in stages if stage['stage'] == 'index_framework']
+    # Parsed on the first run only; the output is the same as without a cache
+    assert cache.stats()['hits'] == 1 and not parsed
+    assert build_index(outputs[1]) == build_index(expected)
+
+    # The written workbook's index was cached when it was saved
+    assert load_index(outputs[1], cache) == build_index(outputs[1])
+    assert cache.stats()['hits'] == 2
+
+def test_new_workbook_is_loaded_once_when_mapped_in_place(tmp_path, monkeypatch):
+    import openpyxl
+    loads = []
+    load_workbook = openpyxl.load_workbook
+
+    def spy(*args, **kwargs):
+        loads.append(kwargs.get('read_only', False))
+        return load_workbook(*args, **kwargs)
+
+    monkeypatch.setattr(openpyxl, 'load_workbook', spy)
+    cache = DiskCache(str(tmp_path / 'frameworks.sqlite'))
+    output = BytesIO()
+    with collect_metrics() as stages:
+        assert map_to_framework(OBLIGATIONS, BytesIO(framework_bytes()), output, merge=True, index_cache=cache)
+    # One load, both to index the workbook and to write it; its index is cached
+    assert loads == [False]
+    assert [stage['rows'] for stage in stages if stage['stage'] == 'index_framework'] == [4]
+    assert load_index(BytesIO(framework_bytes()), cache) == build_index(BytesIO(framework_bytes()))
+    assert cache.stats()['hits'] == 1
@@ -0,0 +1,83 @@
+# test_jobs.py
+import threading
+
+from config import JOB_RECENT_ITEMS
+from jobs import JobManager, DONE, FAILED, CANCELLED
+
+def wait(job):
+    while not job.finished:
+        threading.Event().wait(0.01)
+
+def test_job_reports_progress_and_result():
+    def task(job, items):
+        for item in items:
+            job.advance('items')
+            job.add_items([item])
+        return sum(items)
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit('sum', task, [1, 2, 3])
+    wait(job)
+    assert job.status == DONE and job.result == 6
+    assert job.snapshot()['progress'] == {'items': 3}
+    assert manager.get(job.id) is job
+
+def test_snapshot_keeps_only_the_latest_items():
+    def task(job):
+        for start in range(0, 25, 5):
+            job.add_items(list(range(start, start + 5)))
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit('items', task)
+    wait(job)
+    snapshot = job.snapshot()
+    assert snapshot['items'] == list(range(25))[-JOB_RECENT_ITEMS:] and snapshot['item_count'] == 25
+
+def test_cancel_stops_a_running_job():
+    started = threading.Event()
+
+    def task(job):
+        started.set()
+        while True:
+            job.advance('ticks')
+
+    manager = JobManager(max_workers=1)
+    job = manager.submit('forever', task)
+    started.wait(5)
+    manager.cancel(job.id)
+    wait(job)
+    assert job.status == CANCELLED
+
+def test_failed_job_keeps_error():
+    def task(job):
+        raise ValueError("bad document")
+
+    job = JobManager(max_workers=1).submit('fail', task)
+    wait(job)
+    assert job.status == FAILED and job.error == "bad document"
+
+def test_shutdown_cancels_running_jobs():
+    started = threading.Event()
+
+    def task(job):
+        started.set()
+        while True:
+            job.advance('ticks')
+
+    manager = JobManager(max_workers=1)
+    running = manager.submit('forever', task)
+    queued = manager.submit('queued', task)
+    started.wait(5)
+    manager.shutdown()
+    wait(running)
+    assert running.status == CANCELLED and queued.cancel_requested
+
+def test_running_job_does_not_hold_up_process_exit():
+    import subprocess
+    import sys
+    script = ("from jobs import JobManager\n"
+              "def task(job):\n"
+              "    while True:\n"
+              "        job.advance('ticks')\n"
+              "JobManager(max_workers=1).submit('forever', task)\n")
+    subprocess.run([sys.executable, '-c', script], timeout=30, check=True)
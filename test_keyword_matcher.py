@@ -0,0 +1,51 @@
+# test_keyword_matcher.py
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+from document_reader import read_document
+from extractor import split_into_sentences, extract_obligations
+from keyword_matcher import KeywordMatcher
+
+def legacy_match(sentence, keyword_categories):
+    matches = []
+    for category, keywords in keyword_categories.items():
+        for keyword in keywords:
+            if keyword.lower() in sentence.lower():
+                matches.append((category, keyword))
+                break
+    return matches
+
+def test_matches_legacy_loop_on_sample_documents():
+    matcher = KeywordMatcher(KEYWORD_CATEGORIES)
+    for path in ['test_document.txt', 'test_document_2.txt']:
+        for sentence in split_into_sentences(read_document(path)):
+            assert matcher.match(sentence) == legacy_match(sentence, KEYWORD_CATEGORIES)
+
+def test_overlapping_and_prefix_keywords():
+    rules = {
+        'short': ['transfer'],
+        'long': ['transfer to', 'access'],
+        'overlap': ['right to access', 'access control'],
+    }
+    sentence = "We Transfer to partners under the right to access control policy."
+    assert KeywordMatcher(rules).match(sentence) == legacy_match(sentence, rules)
+
+def test_word_boundaries():
+    sentence = "Customers may disagree with the decision."
+    assert KeywordMatcher(KEYWORD_CATEGORIES).match(sentence) == [('user_consent', 'agree')]
+    assert KeywordMatcher(KEYWORD_CATEGORIES, word_boundaries=True).match(sentence) == []
+
+    rules = {'transfers': ['transfer', 'transfer to']}
+    assert KeywordMatcher(rules, word_boundaries=True).match("data is transferred to x") == []
+    assert KeywordMatcher(rules, word_boundaries=True).match("transfer to x") == [('transfers', 'transfer')]
+
+def test_extract_obligations_shape():
+    obligations = extract_obligations("We will notify you of any security breach within 72 hours.",
+                                      KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN)
+    assert obligations == [{
+        'text': "We will notify you of any security breach within 72 hours.",
+        'category': 'breach_notification',
+        'matched_keyword': 'breach',
+        'domain': 'Incident and Breach Management',
+        'page': None,
+        'start': 0,
+        'end': 58
+    }]
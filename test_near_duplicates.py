@@ -0,0 +1,24 @@
+# test_near_duplicates.py
+from excel_mapper import format_texts, merge_bullets
+from near_duplicates import collapse_near_duplicates
+
+CLAUSES = [
+    "Acme Ltd shall notify the customer of any personal data breach within 72 hours of becoming aware of it.",
+    "Invoices are payable within thirty days of receipt.",
+    "Beta Corp shall notify the customer of any personal data breach within 72 hours of becoming aware of it.",
+    "Acme Ltd shall notify the customer of any personal data breach within 72 hours of becoming aware of it.",
+    "Gamma Inc shall notify the customer of any personal data breach within 48 hours of becoming aware of it.",
+]
+
+def test_near_duplicates_collapse_into_first_clause():
+    # Exact repeats count as similar; Gamma differs in two places (similarity 0.55)
+    assert collapse_near_duplicates(CLAUSES, 0.7) == [(CLAUSES[0], 2), (CLAUSES[1], 0), (CLAUSES[4], 0)]
+    assert collapse_near_duplicates(CLAUSES, 0.95) == [(CLAUSES[0], 1), (CLAUSES[1], 0), (CLAUSES[2], 0),
+                                                       (CLAUSES[4], 0)]
+
+def test_collapsed_bullets_keep_order_and_merge_by_clause():
+    bullets = format_texts(CLAUSES, 0.7)
+    # Repeats of the same text are not counted as similar clauses
+    assert bullets == f"• {CLAUSES[0]} (+1 similar)\n• {CLAUSES[1]}\n• {CLAUSES[4]}"
+    assert format_texts(CLAUSES) == "\n".join(f"• {text}" for text in dict.fromkeys(CLAUSES))
+    assert merge_bullets(f"• {CLAUSES[0]} (+4 similar)", bullets) == bullets
@@ -0,0 +1,90 @@
+# test_observation_store.py
+from config import KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN
+from document_reader import read_document
+from observation_store import ObservationStore, store_path_for
+from pipeline import stream_obligations
+
+def test_stored_clauses_keep_their_source_span(tmp_path):
+    store = ObservationStore(str(tmp_path / 'store.sqlite'))
+    obligations = list(stream_obligations('test_document_2.txt', KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+    store.add_document('test_document_2.txt', 'hash-2', obligations)
+
+    text = read_document('test_document_2.txt')
+    for stored in store.obligations():
+        assert stored['end'] > stored['start']
+        assert ' '.join(text[stored['start']:stored['end']].split()) == stored['text']
+    store.close()
+
+def extract(path):
+    return list(stream_obligations(path, KEYWORD_CATEGORIES, CATEGORY_TO_DOMAIN))
+
+def write_framework(path):
+    from openpyxl import Workbook
+    from excel_mapper import FRAMEWORK_SHEET
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = FRAMEWORK_SHEET
+    worksheet.append(['Control Ref', 'Domain', 'Keywords', 'Observation'])
+    for row, domain in enumerate(sorted(set(CATEGORY_TO_DOMAIN.values())), 1):
+        worksheet.append([f"C-{row}", domain, None, None])
+    workbook.save(path)
+
+def observations(path):
+    from excel_mapper import read_framework_sheet
+    frame = read_framework_sheet(path)
+    return dict(zip(frame['Domain'], frame['Observation'].fillna('')))
+
+def test_re_adding_a_document_stores_nothing_new(tmp_path):
+    store = ObservationStore(str(tmp_path / 'store.sqlite'))
+    obligations = extract('test_document.txt')
+    first = store.add_document('test_document.txt', 'hash-1', obligations)
+    assert first == store.count_obligations() > 0
+    assert store.add_document('test_document.txt', 'hash-1', obligations) == 0
+    assert store.count_documents() == 1 and store.count_obligations() == first
+    store.close()
+
+def test_export_merges_documents_and_is_idempotent(tmp_path):
+    store = ObservationStore(str(tmp_path / 'store.sqlite'))
+    framework = str(tmp_path / 'framework.xlsx')
+    output = str(tmp_path / 'working.xlsx')
+    write_framework(framework)
+
+    store.add_document('test_document.txt', 'hash-1', extract('test_document.txt'))
+    assert store.export_framework(framework, output, ['hash-1'])
+    before = observations(output)
+
+    # A second document's clauses join the bullets already in the workbook
+    store.add_document('test_document_2.txt', 'hash-2', extract('test_document_2.txt'))
+    assert store.export_framework(output, output, ['hash-1', 'hash-2'])
+    after = observations(output)
+    for domain, bullets in before.items():
+        assert all(line in after[domain].split('\n') for line in bullets.split('\n') if line)
+    assert sum(len(text) for text in after.values()) > sum(len(text) for text in before.values())
+
+    # Exporting the same store again changes nothing
+    with open(output, 'rb') as file:
+        exported = file.read()
+    assert store.export_framework(output, output, ['hash-1', 'hash-2'])
+    with open(output, 'rb') as file:
+        assert file.read() == exported
+    store.close()
+
+def test_export_leaves_out_documents_of_earlier_runs(tmp_path):
+    framework = str(tmp_path / 'framework.xlsx')
+    output = str(tmp_path / 'working.xlsx')
+    write_framework(framework)
+    assert store_path_for(output) == str(tmp_path / 'working.observations.sqlite')
+
+    store = ObservationStore(store_path_for(output))
+    store.add_document('test_document.txt', 'hash-1', extract('test_document.txt'))
+    store.add_document('test_document_2.txt', 'hash-2', extract('test_document_2.txt'))
+    # A fresh framework gets only the documents of this run
+    assert store.export_framework(framework, output, ['hash-2'])
+    exported = observations(output)
+    store.close()
+
+    only_second = ObservationStore(str(tmp_path / 'second.sqlite'))
+    only_second.add_document('test_document_2.txt', 'hash-2', extract('test_document_2.txt'))
+    assert only_second.export_framework(framework, str(tmp_path / 'expected.xlsx'), ['hash-2'])
+    only_second.close()
+    assert exported == observations(str(tmp_path / 'expected.xlsx'))
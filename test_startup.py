@@ -0,0 +1,11 @@
+# test_startup.py
+import subprocess
+import sys
+
+from benchmarks.run_benchmarks import HEAVY_MODULES
+
+def test_entry_points_import_without_heavy_dependencies():
+    for module in ['main', 'batch', 'app', 'observation_summarizer']:
+        code = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert completed.stdout.split() == [], module
@@ -1,4 +1,6 @@
 # test_summarizer.py
+import pytest
+
 from comprehensive_summarizer import ComprehensiveObservationSummarizer
 
 def test_specific_keywords():
@@ -27,5 +29,136 @@ def test_specific_keywords():
         print(f"Output: {result}")
         print("---")
 
+CACHED_ROWS = ['• Access is restricted to authorized staff and reviewed quarterly',
+               '• Personal data is encrypted at rest and in transit']
+CACHED_KEYWORDS = ['Access Control', 'Encryption']
+
+def test_cached_summaries_are_reused_until_the_rules_change(monkeypatch):
+    import comprehensive_summarizer
+    from cache import TieredCache
+    cache = TieredCache()
+    expected = ComprehensiveObservationSummarizer(cache=cache).generate_concise_observations(
+        CACHED_ROWS, CACHED_KEYWORDS)
+    assert all(expected) and cache.misses == len(CACHED_ROWS)
+
+    # Same rules: every row is served from the cache, nothing is summarized
+    summarizer = ComprehensiveObservationSummarizer(cache=cache)
+    monkeypatch.setattr(summarizer, '_summarize', lambda *args, **kwargs: pytest.fail("summarized a cached row"))
+    assert summarizer.generate_concise_observations(CACHED_ROWS, CACHED_KEYWORDS) == expected
+    assert summarizer.generate_concise_observation(CACHED_ROWS[0], CACHED_KEYWORDS[0]) == expected[0]
+    assert cache.memory_hits == len(CACHED_ROWS) + 1
+
+    # A new rule set version changes every key, so nothing old is reused
+    monkeypatch.setattr(comprehensive_summarizer, 'SUMMARIZER_VERSION', comprehensive_summarizer.SUMMARIZER_VERSION + 1)
+    bumped = ComprehensiveObservationSummarizer(cache=cache)
+    assert bumped.rules_version != summarizer.rules_version
+    assert bumped.generate_concise_observations(CACHED_ROWS, CACHED_KEYWORDS) == expected
+    assert cache.misses == 2 * len(CACHED_ROWS)
+
+class StubDoc:
+    def __init__(self, text):
+        self.sents = [StubSentence(part) for part in text.split('. ') if part]
+
+class StubSentence:
+    def __init__(self, text):
+        self.text = text
+
+class StubNLP:
+    """Splits sentences on '. ' and counts how it was called"""
+    def __init__(self):
+        self.calls = 0
+        self.piped = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return StubDoc(text)
+
+    def pipe(self, texts, batch_size=256, n_process=1):
+        for text in texts:
+            self.piped += 1
+            yield StubDoc(text)
+
+EQUIVALENCE_KEYWORDS = ['Data Protection Officer', 'Roles and Responsibilities', 'Consent', 'Access Control',
+                        'Encryption', 'Impact Assessment', 'Right to Erasure', 'Breach Notification',
+                        'Privacy Notice', 'Data Retention', 'Cookies', '', None]
+
+def equivalence_rows(summarizer, count=400):
+    """Random rows mixing each pattern group's terms with filler sentences"""
+    import random
+    generator = random.Random(7)
+    terms = [term for patterns in summarizer.keyword_patterns.values()
+             for group in patterns.values() for term in group]
+    filler = ['The company keeps records of processing. ', 'Short. ', 'Staff are told about this policy. ',
+              '• Requests are handled within thirty days', 'Data is shared with processors only. ']
+    observations, keywords = [], []
+    for _ in range(count):
+        parts = generator.sample(filler, generator.randint(0, 3))
+        parts += [generator.choice(terms).upper() if generator.random() < 0.1 else generator.choice(terms)
+                  for _ in range(generator.randint(0, 2))]
+        generator.shuffle(parts)
+        observation = ' '.join(parts)
+        observations.append([observation, observation[:30]] if generator.random() < 0.2 else observation)
+        keywords.append(generator.choice(EQUIVALENCE_KEYWORDS))
+    return observations, keywords
+
+def previous_key_actions(summarizer, text, keyword):
+    """extract_key_actions as it was before the rules were compiled: one 'in' test per term"""
+    patterns = summarizer.keyword_patterns[summarizer._find_pattern_key(keyword.lower().strip())]
+    text_lower = text.lower()
+    return {category: [term for term in terms if term in text_lower]
+            for category, terms in patterns.items() if any(term in text_lower for term in terms)}
+
+def previous_branch(keyword):
+    """Branch chosen by the chain of 'any(term in keyword)' tests the compiled regexes replaced"""
+    from comprehensive_summarizer import _OBSERVATION_BRANCHES
+    keyword_lower = keyword.lower()
+    for branch, terms in _OBSERVATION_BRANCHES:
+        if any(term in keyword_lower for term in terms):
+            return branch
+    return 'general'
+
+def test_batched_summaries_match_per_row_summaries(monkeypatch):
+    import comprehensive_summarizer
+    nlp = StubNLP()
+    monkeypatch.setattr(comprehensive_summarizer, '_nlp', nlp)
+    summarizer = ComprehensiveObservationSummarizer()
+    observations, keywords = equivalence_rows(summarizer)
+
+    per_row = [summarizer.generate_concise_observation(observation, "" if keyword is None else keyword)
+               for observation, keyword in zip(observations, keywords)]
+    calls = nlp.calls
+    batched = summarizer.generate_concise_observations(observations, keywords, batch_size=16)
+    assert batched == per_row
+    # The sentence fallback was exercised, and the batch parsed with pipe only
+    assert calls > 0 and nlp.piped == calls and nlp.calls == calls
+
+    # Compiled keyword rules agree with the term-by-term checks they replaced
+    for observation, keyword in zip(observations, keywords):
+        text = summarizer._combine_observations(observation)
+        keyword = keyword or ""
+        assert dict(summarizer.extract_key_actions(text, keyword)) == previous_key_actions(summarizer, text, keyword)
+        assert summarizer._branch_for_keyword(keyword.lower()) == previous_branch(keyword)
+
+def test_sentence_pipeline_runs_senter_without_the_shared_tok2vec(tmp_path, monkeypatch):
+    import spacy
+    from spacy.training import Example
+    import comprehensive_summarizer
+    # Laid out like the small English models: the tagger listens to the shared
+    # tok2vec, and senter (with its own embedding) is disabled by default
+    nlp = spacy.blank('en')
+    for name in ('tok2vec', 'tagger', 'senter'):
+        nlp.add_pipe(name)
+    doc = nlp.make_doc("Data is kept. It is deleted later.")
+    nlp.initialize(lambda: [Example.from_dict(doc, {'tags': ['N', 'V', 'V', '.', 'P', 'V', 'V', 'R', '.'],
+                                                    'sent_starts': [1, 0, 0, 0, 1, 0, 0, 0, 0]})])
+    nlp.disable_pipe('senter')
+    nlp.to_disk(tmp_path / 'model')
+
+    monkeypatch.setattr(comprehensive_summarizer, 'SPACY_MODEL', str(tmp_path / 'model'))
+    monkeypatch.setattr(comprehensive_summarizer, '_nlp', None)
+    loaded = comprehensive_summarizer.get_nlp()
+    assert loaded.pipe_names == ['senter']
+    assert list(loaded("Data is kept. It is deleted later.").sents)
+
 if __name__ == "__main__":
     test_specific_keywords()
\ No newline at end of file
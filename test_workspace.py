@@ -0,0 +1,67 @@
+# test_workspace.py
+import os
+import threading
+import time
+
+from workspace import SessionWorkspace, purge_stale_workspaces
+
+def make_stale(workspace):
+    for entry in os.scandir(workspace.directory):
+        os.utime(entry.path, (0, 0))
+    os.utime(workspace.directory, (0, 0))
+
+def test_purge_removes_only_stale_unlocked_workspaces(tmp_path):
+    root = str(tmp_path)
+    stale = SessionWorkspace('stale', root)
+    stale.write('policy.txt', b'old')
+    make_stale(stale)
+    busy = SessionWorkspace('busy', root)
+    with busy.lock():
+        busy.write('policy.txt', b'in use')
+    make_stale(busy)
+    fresh = SessionWorkspace('fresh', root)
+    fresh.write('policy.txt', b'new')
+
+    with busy.lock():
+        assert purge_stale_workspaces(root, max_age=60) == 1
+    assert sorted(os.listdir(root)) == ['busy', 'fresh']
+
+def test_session_waiting_for_the_lock_survives_a_purge(tmp_path):
+    workspace = SessionWorkspace('session', str(tmp_path))
+    written = []
+
+    def session():
+        with workspace.lock():
+            written.append(workspace.write('policy.txt', b'data'))
+
+    waiting = threading.Thread(target=session)
+    with workspace.lock():
+        waiting.start()
+        time.sleep(0.1)
+        # What a purge does while it holds the lock
+        os.unlink(os.path.join(workspace.directory, '.lock'))
+        os.rmdir(workspace.directory)
+    waiting.join(5)
+    with open(written[0], 'rb') as file:
+        assert file.read() == b'data'
+
+def test_purge_skips_files_removed_during_the_scan(tmp_path, monkeypatch):
+    import workspace as workspace_module
+    root = str(tmp_path)
+    for session_id in ('first', 'second'):
+        stale = SessionWorkspace(session_id, root)
+        stale.write('policy.txt', b'old')
+        stale.write('upload.pdf', b'old')
+        make_stale(stale)
+
+    # A session removes its upload between the directory listing and the stat
+    scandir = os.scandir
+    def listing_then_removal(path):
+        entries = list(scandir(path))
+        upload = os.path.join(path, 'upload.pdf')
+        if os.path.exists(upload):
+            os.unlink(upload)
+        return iter(entries)
+    monkeypatch.setattr(workspace_module.os, 'scandir', listing_then_removal)
+    assert purge_stale_workspaces(root, max_age=60) == 2
+    assert os.listdir(root) == []
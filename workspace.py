@@ -0,0 +1,164 @@
+# workspace.py
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+from config import SCRATCH_ROOT, SCRATCH_MAX_AGE_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_LOCK_FILE = '.lock'
+
+class SessionWorkspace:
+    """
+    Private scratch directory for one web session.
+
+    Uploaded documents that have to be on disk for the readers are written
+    here instead of a shared location, so concurrent sessions never touch each
+    other's files. While the session works in the directory it holds an
+    exclusive lock on it, which keeps purge_stale_workspaces from removing it.
+    """
+
+    def __init__(self, session_id=None, root=SCRATCH_ROOT):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.directory = os.path.join(root, self.session_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name):
+        """Path for a file in the workspace (only the base name is used)"""
+        return os.path.join(self.directory, os.path.basename(name))
+
+    def write(self, name, data):
+        """Write bytes atomically and return the file's path"""
+        target = self.path(name)
+        partial = f"{target}.{uuid.uuid4().hex}.part"
+        with open(partial, 'wb') as file:
+            file.write(data)
+        os.replace(partial, target)
+        return target
+
+    def remove(self, name):
+        try:
+            os.unlink(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, blocking=True):
+        """
+        Hold the workspace's exclusive lock. Yields True, or False when
+        blocking=False and another process holds it.
+        """
+        while True:
+            os.makedirs(self.directory, exist_ok=True)
+            lock_file = open(os.path.join(self.directory, _LOCK_FILE), 'a+b')
+            locked = _acquire(lock_file, blocking)
+            if not locked or _is_current(lock_file):
+                break
+            # The workspace was purged while we waited for its lock: start over
+            _release(lock_file)
+            lock_file.close()
+        try:
+            yield locked
+        finally:
+            if locked:
+                _release(lock_file)
+            lock_file.close()
+
+def purge_stale_workspaces(root=SCRATCH_ROOT, max_age=SCRATCH_MAX_AGE_SECONDS):
+    """
+    Remove session workspaces untouched for max_age seconds.
+    Workspaces that are currently locked are left alone. Returns how many were removed.
+    """
+    if not os.path.isdir(root):
+        return 0
+
+    removed = 0
+    cutoff = time.time() - max_age
+    for session_id in os.listdir(root):
+        directory = os.path.join(root, session_id)
+        try:
+            if not os.path.isdir(directory) or _last_modified(directory) > cutoff:
+                continue
+        except FileNotFoundError:
+            # Removed while we looked at it
+            continue
+        workspace = SessionWorkspace(session_id, root)
+        with workspace.lock(blocking=False) as locked:
+            # A session may have written to it between the check and taking the
+            # lock (taking the lock may itself have touched the directory)
+            if not locked or _last_modified(directory, files_only=True) > cutoff:
+                continue
+            # Remove it while still locked, so no session can start using it
+            # halfway through
+            for entry in os.scandir(directory):
+                if entry.name == _LOCK_FILE:
+                    continue
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+            try:
+                os.unlink(os.path.join(directory, _LOCK_FILE))
+                os.rmdir(directory)
+            except OSError:
+                # Windows can't delete the open lock file; the empty directory stays
+                pass
+        removed += 1
+    return removed
+
+def _last_modified(directory, files_only=False):
+    """
+    Latest modification time of a workspace (unless files_only) and of the
+    files in it. Files a session removes during the scan are skipped.
+    """
+    times = [0 if files_only else os.path.getmtime(directory)]
+    for entry in os.scandir(directory):
+        if entry.name == _LOCK_FILE:
+            continue
+        try:
+            times.append(entry.stat().st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(times)
+
+def _is_current(lock_file):
+    """Whether an open lock file is still the one at its path (not purged meanwhile)"""
+    try:
+        current = os.stat(lock_file.name)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(lock_file.fileno())
+    return (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+
+def _acquire(lock_file, blocking):
+    if fcntl is not None:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file.fileno(), flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+    while True:
+        try:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), mode, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+
+def _release(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)